@@ -0,0 +1,184 @@
+"""
+Compares the JSON decoders available to homeharvest.core.decoder (json, orjson, msgspec) on home_search responses:
+decode time per page & throughput, on one thread and on several threads at once (as the scheduler's workers do).
+
+usage: python benchmarks/bench_json_decode.py [recording.jsonl] [--threads N]
+The recording is a RecordingTransport file, whose home_search responses are decoded. Without one, synthetic 200-result
+pages shaped like home_search responses are used.
+"""
+
+import argparse
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from homeharvest.core.decoder import DECODERS
+
+SYNTHETIC_PAGES = 20
+ROUNDS = 5
+
+
+def make_result(i: int) -> dict:
+    phones = [{"number": f"555555{i:04d}", "type": "Mobile", "primary": True, "ext": None}]
+    return {
+        "pending_date": None,
+        "listing_id": str(2900000000 + i),
+        "property_id": str(1000000000 + i),
+        "href": f"https://www.realtor.com/realestateandhomes-detail/{i}_Main-St_Dallas_TX_75201_M{i}",
+        "list_date": "2024-05-01T00:00:00.000000Z",
+        "status": "for_sale",
+        "last_sold_price": random.randint(200_000, 2_000_000),
+        "last_sold_date": "2019-06-01",
+        "list_price": random.randint(200_000, 2_000_000),
+        "list_price_max": None,
+        "list_price_min": None,
+        "price_per_sqft": random.randint(100, 900),
+        "flags": {"is_contingent": None, "is_pending": None, "is_new_construction": None},
+        "description": {
+            "type": "single_family",
+            "sqft": random.randint(800, 4000),
+            "beds": 3,
+            "baths_full": 2,
+            "baths_half": 1,
+            "lot_sqft": 6000,
+            "year_built": 1990,
+            "garage": 2,
+            "name": None,
+            "stories": 2,
+            "text": "Charming home with an updated kitchen, hardwood floors & a large backyard. " * 4,
+        },
+        "source": {"id": "NTREIS", "listing_id": str(20000000 + i)},
+        "hoa": {"fee": 50},
+        "location": {
+            "address": {
+                "street_direction": None,
+                "street_number": str(i),
+                "street_name": "Main",
+                "street_suffix": "St",
+                "line": f"{i} Main St",
+                "unit": None,
+                "city": "Dallas",
+                "state_code": "TX",
+                "postal_code": "75201",
+                "coordinate": {"lon": -96.8 + i / 1e4, "lat": 32.7 + i / 1e4},
+            },
+            "county": {"name": "Dallas", "fips_code": "48113"},
+            "neighborhoods": [{"name": "Downtown"}, {"name": "Central Dallas"}],
+        },
+        "tax_record": {"public_record_id": str(i)},
+        "primary_photo": {"href": f"https://ap.rdcpix.com/{i}l-m{i}s.jpg"},
+        "photos": [{"href": f"https://ap.rdcpix.com/{i}l-m{n}s.jpg"} for n in range(25)],
+        "advertisers": [
+            {
+                "email": "agent@example.com",
+                "broker": {"name": "Realty Co", "fulfillment_id": "42"},
+                "type": "seller",
+                "name": "Jane Doe",
+                "fulfillment_id": str(i),
+                "builder": None,
+                "phones": phones,
+                "office": {
+                    "name": "Realty Co Dallas",
+                    "email": "office@example.com",
+                    "fulfillment_id": "43",
+                    "href": "https://www.realtyco.example.com",
+                    "phones": phones,
+                    "mls_set": "O-NTREIS-1",
+                },
+                "corporation": {"specialties": None, "name": None, "bio": None, "href": None, "fulfillment_id": None},
+                "mls_set": "A-NTREIS-1",
+                "nrds_id": str(i),
+                "rental_corporation": None,
+                "rental_management": None,
+            }
+        ],
+        "current_estimates": [
+            {
+                "__typename": "LatestEstimate",
+                "source": {"__typename": "EstimateSource", "type": "corelogic", "name": "Cotality"},
+                "estimate": 500000,
+                "estimateHigh": 550000,
+                "estimateLow": 450000,
+                "date": "2024-05-01",
+                "isBestHomeValue": True,
+            }
+        ],
+    }
+
+
+def synthetic_pages() -> list[bytes]:
+    random.seed(0)
+    return [
+        json.dumps(
+            {
+                "data": {
+                    "home_search": {
+                        "count": 200,
+                        "total": 4000,
+                        "results": [make_result(page * 200 + i) for i in range(200)],
+                    }
+                }
+            }
+        ).encode()
+        for page in range(SYNTHETIC_PAGES)
+    ]
+
+
+def recorded_pages(path: str) -> list[bytes]:
+    with open(path) as recording:
+        exchanges = [json.loads(line) for line in recording if line.strip()]
+
+    return [
+        exchange["content"].encode("utf-8")
+        for exchange in exchanges
+        if exchange["status_code"] == 200 and '"home_search"' in exchange["content"]
+    ]
+
+
+def decode_all(decoder, pages: list[bytes], threads: int) -> float:
+    started_at = time.perf_counter()
+
+    if threads == 1:
+        for page in pages:
+            decoder(page)
+    else:
+        with ThreadPoolExecutor(threads) as executor:
+            list(executor.map(decoder, pages))
+
+    return time.perf_counter() - started_at
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("recording", nargs="?", help="RecordingTransport file with home_search responses")
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    pages = recorded_pages(args.recording) if args.recording else synthetic_pages()
+    if not pages:
+        raise SystemExit("No home_search responses in the recording.")
+
+    megabytes = sum(map(len, pages)) / 1e6
+    print(f"{len(pages)} pages, {megabytes / len(pages) * 1000:.0f} KB per page")
+    print(f"{'decoder':>8} {'threads':>8} {'ms/page':>9} {'MB/s':>8} {'speedup':>9}")
+
+    baseline = {}
+    for name in sorted(DECODERS, key=lambda name: name != "json"):  #: json first, as the baseline
+        try:
+            decoder = DECODERS[name]()
+        except ImportError:
+            print(f"{name:>8} not installed")
+            continue
+
+        for threads in (1, args.threads):
+            seconds = min(decode_all(decoder, pages, threads) for _ in range(ROUNDS))
+            baseline.setdefault(threads, seconds)
+            print(
+                f"{name:>8} {threads:>8} {seconds / len(pages) * 1000:>9.2f} {megabytes / seconds:>8.0f} "
+                f"{baseline[threads] / seconds:>8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
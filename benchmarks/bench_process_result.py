@@ -0,0 +1,103 @@
+"""
+Compares the legacy per-row DataFrame construction (one single-row frame per Property, pd.concat, global replace)
+against the columnar PropertyFrameBuilder used by scrape_property.
+
+usage: python benchmarks/bench_process_result.py [sizes ...]
+"""
+
+import sys
+import time
+import random
+import warnings
+
+import pandas as pd
+
+from homeharvest.utils import ordered_properties, process_results
+from homeharvest.core.scrapers.models import Property, Address, Description, Advertisers, Agent, Office, PropertyType
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+
+def make_property(i: int) -> Property:
+    return Property(
+        property_url=f"https://www.realtor.com/realestateandhomes-detail/{i}",
+        property_id=str(1000000000 + i),
+        listing_id=str(2900000000 + i),
+        mls="SDCA",
+        mls_id=str(230000000 + i),
+        status=random.choice(["SOLD", "FOR_SALE", "PENDING"]),
+        address=Address(
+            full_line=f"{i} Main St",
+            street=f"{i} Main St",
+            unit=None,
+            city="San Diego",
+            state="CA",
+            zip="92101",
+        ),
+        list_price=random.randint(200_000, 2_000_000),
+        list_date="2024-05-01",
+        last_sold_date="2024-06-01",
+        prc_sqft=random.randint(200, 900),
+        new_construction=False,
+        days_on_mls=random.randint(0, 120),
+        description=Description(
+            primary_photo=f"https://ap.rdcpix.com/{i}.webp",
+            alt_photos=[f"https://ap.rdcpix.com/{i}-{n}.webp" for n in range(10)],
+            style=PropertyType.SINGLE_FAMILY,
+            beds=3,
+            baths_full=2,
+            sqft=random.randint(800, 4000),
+            year_built=1990,
+            text="",
+        ),
+        latitude=32.7,
+        longitude=-117.1,
+        county="San Diego",
+        nearby_schools=["San Diego Unified School District"],
+        tax_history=[{"year": 2023, "tax": 5000, "assessment": {"building": 1, "land": 2, "total": 3}}],
+        advertisers=Advertisers(
+            agent=Agent(name="Jane Doe", uuid=str(i), phones=[{"number": "5555555555", "type": "Mobile"}]),
+            office=Office(name="Realty Co", uuid="42", email="None"),
+        ),
+    )
+
+
+def legacy_process_result(result: Property) -> pd.DataFrame:
+    from homeharvest.utils import flatten_property
+
+    #: flatten_property already normalizes, so re-create the raw None-bearing row for a fair comparison
+    prop_data = {column: (None if value is pd.NA else value) for column, value in flatten_property(result).items()}
+    properties_df = pd.DataFrame([prop_data])
+    properties_df = properties_df.reindex(columns=ordered_properties)
+    return properties_df[ordered_properties]
+
+
+def legacy(results: list[Property]) -> pd.DataFrame:
+    properties_dfs = [df for result in results if not (df := legacy_process_result(result)).empty]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=FutureWarning)
+        return pd.concat(properties_dfs, ignore_index=True, axis=0)[ordered_properties].replace(
+            {"None": pd.NA, None: pd.NA, "": pd.NA}
+        )
+
+
+def timed(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or DEFAULT_SIZES
+    random.seed(0)
+
+    print(f"{'rows':>8} {'legacy (s)':>12} {'columnar (s)':>14} {'speedup':>9}")
+    for size in sizes:
+        properties = [make_property(i) for i in range(size)]
+        legacy_seconds = timed(legacy, properties)
+        columnar_seconds = timed(process_results, properties)
+        print(f"{size:>8} {legacy_seconds:>12.3f} {columnar_seconds:>14.3f} {legacy_seconds / columnar_seconds:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Measures, with tracemalloc, the memory held per Property once home_search results are parsed: with the slotted models
+& interned strings used by the scraper, against the baseline models (plain dataclasses, with a per-instance __dict__)
+built by the same parser with interning turned off.
+
+On synthetic 200-result pages the slotted models & interning hold about 8% less memory per property (~7340 -> ~6740
+bytes); photo URLs & listing text dominate the rest.
+
+usage: python benchmarks/bench_property_memory.py [sizes ...]
+"""
+
+import gc
+import json
+import os
+import sys
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import MISSING, field, fields, is_dataclass, make_dataclass
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  #: runnable from a checkout
+
+from homeharvest.core.scrapers import ScraperInput
+from homeharvest.core.scrapers import realtor
+from homeharvest.core.scrapers.models import ListingType
+from homeharvest.core.scrapers.realtor import RealtorScraper
+
+DEFAULT_SIZES = [1_000, 10_000]
+
+
+def make_result(i: int) -> dict:
+    """
+    A home_search result, with every section the parser reads
+    """
+    phones = [{"number": f"555555{i:04d}", "type": "Mobile", "primary": True, "ext": None}]
+    return {
+        "pending_date": None,
+        "listing_id": str(2900000000 + i),
+        "property_id": str(1000000000 + i),
+        "href": f"https://www.realtor.com/realestateandhomes-detail/{i}_Main-St_Dallas_TX_75201_M{i}",
+        "list_date": "2024-05-01T00:00:00.000000Z",
+        "status": "for_sale",
+        "last_sold_price": 200_000 + i,
+        "last_sold_date": "2019-06-01",
+        "list_price": 250_000 + i,
+        "list_price_max": None,
+        "list_price_min": None,
+        "price_per_sqft": 100 + i % 800,
+        "flags": {"is_contingent": None, "is_pending": None, "is_new_construction": None},
+        "description": {
+            "type": "single_family",
+            "sqft": 800 + i % 3200,
+            "beds": 3,
+            "baths_full": 2,
+            "baths_half": 1,
+            "lot_sqft": 6000,
+            "year_built": 1990,
+            "garage": 2,
+            "name": None,
+            "stories": 2,
+            "text": "Charming home with an updated kitchen, hardwood floors & a large backyard. " * 4,
+        },
+        "source": {"id": "NTREIS", "listing_id": str(20000000 + i)},
+        "hoa": {"fee": 50},
+        "location": {
+            "address": {
+                "street_direction": None,
+                "street_number": str(i),
+                "street_name": "Main",
+                "street_suffix": "St",
+                "line": f"{i} Main St",
+                "unit": None,
+                "city": "Dallas",
+                "state_code": "TX",
+                "postal_code": "75201",
+                "coordinate": {"lon": -96.8 + i / 1e4, "lat": 32.7 + i / 1e4},
+            },
+            "county": {"name": "Dallas", "fips_code": "48113"},
+            "neighborhoods": [{"name": "Downtown"}, {"name": "Central Dallas"}],
+        },
+        "tax_record": {"public_record_id": str(i)},
+        "primary_photo": {"href": f"https://ap.rdcpix.com/{i}l-m{i}s.jpg"},
+        "photos": [{"href": f"https://ap.rdcpix.com/{i}l-m{n}s.jpg"} for n in range(25)],
+        "advertisers": [
+            {
+                "email": "agent@example.com",
+                "broker": {"name": "Realty Co", "fulfillment_id": "42"},
+                "type": "seller",
+                "name": "Jane Doe",
+                "fulfillment_id": str(i),
+                "builder": None,
+                "phones": phones,
+                "office": {
+                    "name": "Realty Co Dallas",
+                    "email": "office@example.com",
+                    "fulfillment_id": "43",
+                    "href": "https://www.realtyco.example.com",
+                    "phones": phones,
+                    "mls_set": "O-NTREIS-1",
+                },
+                "corporation": {"specialties": None, "name": None, "bio": None, "href": None, "fulfillment_id": None},
+                "mls_set": "A-NTREIS-1",
+                "nrds_id": str(i),
+                "rental_corporation": None,
+                "rental_management": None,
+            }
+        ],
+        "current_estimates": [
+            {
+                "__typename": "LatestEstimate",
+                "source": {"__typename": "EstimateSource", "type": "corelogic", "name": "Cotality"},
+                "estimate": 500000,
+                "estimateHigh": 550000,
+                "estimateLow": 450000,
+                "date": "2024-05-01",
+                "isBestHomeValue": True,
+            }
+        ],
+    }
+
+
+def baseline_class(cls, baseline_classes: dict) -> type:
+    """
+    The model as it was declared before slotted_dataclass: @dataclass over the same fields & bases, so instances keep
+    their fields in a per-instance __dict__
+    """
+    if cls not in baseline_classes:
+        bases = tuple(baseline_class(base, baseline_classes) for base in cls.__bases__ if is_dataclass(base))
+        inherited = {base_field.name for base in bases for base_field in fields(base)}
+        own_fields = [
+            (
+                (model_field.name, model_field.type, field(default=model_field.default))
+                if model_field.default is not MISSING
+                else (model_field.name, model_field.type)
+            )
+            for model_field in fields(cls)
+            if model_field.name not in inherited
+        ]
+        baseline_classes[cls] = make_dataclass(cls.__name__, own_fields, bases=bases)
+
+    return baseline_classes[cls]
+
+
+@contextmanager
+def baseline_parser():
+    """
+    Makes the realtor parser build the baseline models, and keep one string object per value instead of interning
+    """
+    baseline_classes = {}
+    replaced = {
+        name: baseline_class(value, baseline_classes)
+        for name, value in vars(realtor).items()
+        if isinstance(value, type) and is_dataclass(value)
+    }
+    replaced["_interned"] = lambda value: value
+
+    original = {name: getattr(realtor, name) for name in replaced}
+    vars(realtor).update(replaced)
+    try:
+        yield
+    finally:
+        vars(realtor).update(original)
+
+
+def held_bytes(size: int) -> int:
+    """
+    Bytes still allocated once the properties are parsed and the decoded responses dropped
+    """
+    scraper = RealtorScraper(ScraperInput(location="Dallas, TX", listing_type=ListingType.FOR_SALE))
+    payload = json.dumps([make_result(i) for i in range(size)]).encode()
+
+    gc.collect()
+    tracemalloc.start()
+    started_with = tracemalloc.get_traced_memory()[0]
+
+    results = json.loads(payload)
+    properties = [scraper.process_property(result, "home_search") for result in results]
+
+    del results
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - started_with
+    tracemalloc.stop()
+
+    assert len(properties) == size
+    return held
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or DEFAULT_SIZES
+
+    print(f"{'rows':>8} {'before (B/property)':>20} {'after (B/property)':>19} {'saved':>7}")
+    for size in sizes:
+        with baseline_parser():
+            before = held_bytes(size) / size
+        after = held_bytes(size) / size
+        print(f"{size:>8} {before:>20.0f} {after:>19.0f} {1 - after / before:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,38 @@
-import warnings
+import threading
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import replace
+from typing import Callable, Iterator
+
 import pandas as pd
+from .core.cache import ResponseCache, DetailsCache
+from .core.state import WatermarkStore, Checkpoint
+from .core.ratelimit import RateLimiter, DEFAULT_RATE_LIMITER
+from .core.scheduler import Scheduler, DEFAULT_SCHEDULER
+from .core.proxies import ProxyPool
+from .core.metrics import MetricsCollector
+from .core.tracing import RecordingTracer, Profiler, NOOP_TRACER
+from .core.cancellation import CancellationToken
+from .core.decoder import JSONDecoder, get_decoder
+from .core.transport import Transport, RequestsTransport, HttpxTransport, RecordingTransport, ReplayTransport
 from .core.scrapers import ScraperInput
-from .utils import process_result, ordered_properties, validate_input, validate_dates, validate_limit
+from .utils import (
+    process_result,
+    process_results,
+    PropertyFrameBuilder,
+    ordered_properties,
+    validate_input,
+    validate_dates,
+    validate_limit,
+    validate_ranges,
+    validate_columns,
+)
 from .core.scrapers.realtor import RealtorScraper
-from .core.scrapers.models import ListingType, SearchPropertyType
+from .arrow import to_arrow, arrow_schema, ParquetStreamWriter
+from .core.scrapers.realtor.locations import LocationResolver
+from .core.scrapers.realtor.queries import DETAILS_COLUMNS
+from .core.scrapers.models import ListingType, SearchPropertyType, Property
 
 
 def scrape_property(
@@ -13,14 +42,44 @@ def scrape_property(
     radius: float = None,
     mls_only: bool = False,
     past_days: int = None,
-    proxy: str = None,
+    proxy: str | list[str] | ProxyPool = None,
     date_from: str = None,  #: TODO: Switch to one parameter, Date, with date_from and date_to, pydantic validation
     date_to: str = None,
     foreclosure: bool = None,
     extra_property_data: bool = True,
     exclude_pending: bool = False,
     limit: int = 10000,
-) -> pd.DataFrame:
+    extra_property_data_batch_size: int = 50,
+    cache: ResponseCache | str | bool | None = None,
+    location_resolver: LocationResolver | None = None,
+    details_cache: DetailsCache | str | None = None,
+    watermark_store: WatermarkStore | str | None = None,
+    auto_shard: bool = False,
+    rate_limiter: RateLimiter | None = None,
+    scheduler: Scheduler | None = None,
+    transport: Transport | None = None,
+    http2: bool = False,
+    json_decoder: str | JSONDecoder | None = None,
+    metrics: MetricsCollector | None = None,
+    return_stats: bool = False,
+    tracer=None,
+    profile: bool | str = False,
+    timeout: float | None = None,
+    deadline: datetime.datetime | float | None = None,
+    cancellation_token: CancellationToken | None = None,
+    checkpoint: Checkpoint | str | bool | None = None,
+    resume: bool = False,
+    price_min: int | None = None,
+    price_max: int | None = None,
+    beds_min: int | None = None,
+    beds_max: int | None = None,
+    sqft_min: int | None = None,
+    sqft_max: int | None = None,
+    lot_sqft_min: int | None = None,
+    lot_sqft_max: int | None = None,
+    property_filter: Callable[[Property], bool] | None = None,
+    columns: list[str] | None = None,
+) -> pd.DataFrame | tuple[pd.DataFrame, MetricsCollector]:
     """
     Scrape properties from Realtor.com based on a given location and listing type.
     :param location: Location to search (e.g. "Dallas, TX", "85281", "2530 Al Lipscomb Way")
@@ -28,19 +87,384 @@ def scrape_property(
     :param property_type: Property Type (single_family, multi_family, condos, condo_townhome_rowhome_coop, condo_townhome, townhomes, duplex_triplex, farm, land, mobile)
     :param radius: Get properties within _ (e.g. 1.0) miles. Only applicable for individual addresses.
     :param mls_only: If set, fetches only listings with MLS IDs.
-    :param proxy: Proxy to use for scraping
+    :param proxy: Proxy to use for scraping, or a pool of proxies (a list of proxies or a ProxyPool) to spread requests across
     :param past_days: Get properties sold or listed (dependent on your listing_type) in the last _ days.
     :param date_from, date_to: Get properties sold or listed (dependent on your listing_type) between these dates. format: 2021-01-28
     :param foreclosure: If set, fetches only foreclosure listings.
     :param extra_property_data: Increases requests by O(n). If set, this fetches additional property data (e.g. agent, broker, property evaluations etc.)
     :param exclude_pending: If true, this excludes pending or contingent properties from the results, unless listing type is pending.
-    :param limit: Limit the number of results returned. Maximum is 10,000.
+    :param limit: Limit the number of results returned. Maximum is 10,000, unless auto_shard is set.
+    :param extra_property_data_batch_size: Number of properties whose extra data is fetched per request.
+    :param cache: Caches responses on disk and reuses them on later runs. Either True (default location), the path of
+    the cache file or a ResponseCache (e.g. for custom per-endpoint TTLs).
+    :param location_resolver: Resolves locations without the autocomplete request, from an offline gazetteer and
+    previously resolved locations. Zip codes are always resolved offline.
+    :param details_cache: Reuses extra property data (schools, tax history, assessed value) fetched by earlier searches
+    for the same property_id. Either the path of a SQLite file or a DetailsCache (e.g. for a custom TTL).
+    :param watermark_store: Incremental mode. Only returns listings newer than the previous run of the same search,
+    and stops paging once it reaches them. Either the path of a SQLite file or a WatermarkStore. A run whose new
+    listings exceed the limit doesn't move the watermark, and listings without a list date (sold date for sold
+    searches) are only returned by the first run.
+    :param auto_shard: Searches with more than 10,000 results are split by date range, then property type, until each
+    part fits, and the parts are fetched in parallel. Results are deduped by property_id. Only applies with a limit
+    above 10,000; a warning is raised for the results sharding can't reach (e.g. of other property types).
+    :param rate_limiter: Paces the requests to each realtor.com host. Defaults to DEFAULT_RATE_LIMITER, shared by every
+    search in the process; its stats() report the current rate of each host.
+    :param scheduler: Worker threads fetching search pages & extra property data. Defaults to DEFAULT_SCHEDULER, shared
+    by every search in the process.
+    :param transport: Sends the HTTP requests, e.g. HttpxTransport(http2=True), RecordingTransport(path) to record a
+    scrape or ReplayTransport(path) to reproduce it without the network. Defaults to a shared requests session.
+    :param http2: Multiplexes the GraphQL requests over a few HTTP/2 connections (pip install homeharvest[http2]),
+    unless a transport is given.
+    :param json_decoder: Decodes the responses: "orjson", "msgspec", "json" or a function decoding bytes. Defaults to
+    the fastest one installed (pip install homeharvest[fast-json] for orjson).
+    :param metrics: Collects request counts, bytes, status codes, retries & latencies per endpoint and GraphQL query,
+    and the time spent searching & building the DataFrame. Can be shared by several scrapes, e.g. for a dashboard.
+    :param return_stats: If set, returns a (DataFrame, MetricsCollector) tuple. Use the collector's snapshot() or
+    to_prometheus() to read the metrics.
+    :param tracer: Starts a span for each phase of the scrape (location, search pages, extra property data batches,
+    property parsing, DataFrame), e.g. an OpenTelemetry tracer or a RecordingTracer.
+    :param profile: Profiles the scrape with cProfile, worker threads included, and writes the stats to this path (or
+    HomeHarvest_<timestamp>.prof if True), e.g. for snakeviz or a flamegraph.
+    :param timeout: Seconds the scrape may take. Once they're up, no more pages or extra property data are fetched
+    and the properties fetched so far are returned. df.attrs["partial"] tells if anything was skipped, and
+    df.attrs["skipped_pages"], ["skipped_shards"] & ["skipped_details"] how much.
+    :param deadline: Same as timeout, as a time (datetime or time.time() timestamp) instead of a duration.
+    :param cancellation_token: Stops the scrape the same way when its cancel() is called, e.g. from another thread.
+    :param checkpoint: Journals each completed page & the extra property data fetched so far, so a scrape that dies
+    can be resumed. Either True (default location), the path of a SQLite file or a Checkpoint.
+    :param resume: Reuses the pages & extra property data journaled by a previous run of the same search, instead of
+    fetching them again. The journal is cleared once the search completes.
+    :param price_min, price_max: Only fetches listings priced within this range.
+    :param beds_min, beds_max: Only fetches properties with this many bedrooms.
+    :param sqft_min, sqft_max: Only fetches properties with a living area within this range (square feet).
+    :param lot_sqft_min, lot_sqft_max: Only fetches properties with a lot size within this range (square feet).
+    These ranges are sent with the search, so realtor.com only returns (and HomeHarvest only pages & enriches) matching
+    properties. Properties without a value for a filtered field are excluded.
+    :param property_filter: Called with each Property before its extra data is fetched; the property is dropped unless
+    it returns True.
+    :param columns: Only returns these columns (see ordered_properties), in this order. Only the fields they need are
+    requested & parsed (unless a property_filter is given, which is passed fully parsed properties), and extra property
+    data is only fetched for nearby_schools, assessed_value, tax & tax_history.
+    """
+    scraper_input = _scraper_input(
+        location=location,
+        listing_type=listing_type,
+        property_type=property_type,
+        radius=radius,
+        mls_only=mls_only,
+        past_days=past_days,
+        proxy=proxy,
+        date_from=date_from,
+        date_to=date_to,
+        foreclosure=foreclosure,
+        extra_property_data=extra_property_data,
+        exclude_pending=exclude_pending,
+        limit=limit,
+        extra_property_data_batch_size=extra_property_data_batch_size,
+        cache=cache,
+        location_resolver=location_resolver,
+        details_cache=details_cache,
+        watermark_store=watermark_store,
+        auto_shard=auto_shard,
+        rate_limiter=rate_limiter,
+        scheduler=scheduler,
+        transport=transport,
+        http2=http2,
+        json_decoder=json_decoder,
+        metrics=metrics,
+        tracer=tracer,
+        timeout=timeout,
+        deadline=deadline,
+        cancellation_token=cancellation_token,
+        checkpoint=checkpoint,
+        resume=resume,
+        price_min=price_min,
+        price_max=price_max,
+        beds_min=beds_min,
+        beds_max=beds_max,
+        sqft_min=sqft_min,
+        sqft_max=sqft_max,
+        lot_sqft_min=lot_sqft_min,
+        lot_sqft_max=lot_sqft_max,
+        property_filter=property_filter,
+        columns=columns,
+    )
+    scraper_input = replace(scraper_input, profiler=_profiler(profile))
+
+    site = RealtorScraper(scraper_input)
+    with scraper_input.profiler or nullcontext(), site.tracer.start_as_current_span(
+        "scrape_property", attributes={"location": location, "listing_type": listing_type}
+    ) as span:
+        with scraper_input.metrics.stage("search"):
+            results = site.search()
+
+        properties_df = _process_results(site, results)
+        span.set_attribute("results", len(properties_df))
+
+    return (properties_df, scraper_input.metrics) if return_stats else properties_df
+
+
+async def scrape_property_async(
+    location: str, return_stats: bool = False, profile: bool | str = False, **kwargs
+) -> pd.DataFrame | tuple[pd.DataFrame, MetricsCollector]:
+    """
+    Asyncio counterpart of scrape_property, accepting the same parameters. Location resolution, search pages and
+    extra property data are fetched as coroutines on a single httpx client (pip install homeharvest[async]).
+    """
+    from .core.scrapers.realtor.aio import AsyncRealtorScraper
+
+    scraper_input = replace(_scraper_input(location, **kwargs), profiler=_profiler(profile))
+    site = AsyncRealtorScraper(scraper_input)
+    with scraper_input.profiler or nullcontext(), site.tracer.start_as_current_span(
+        "scrape_property", attributes={"location": location, "listing_type": kwargs.get("listing_type", "for_sale")}
+    ) as span:
+        with scraper_input.metrics.stage("search"):
+            results = await site.search()
+
+        properties_df = _process_results(site, results)
+        span.set_attribute("results", len(properties_df))
+
+    return (properties_df, scraper_input.metrics) if return_stats else properties_df
+
+
+def _process_results(site: RealtorScraper, results: list[Property]) -> pd.DataFrame:
+    with site.metrics.stage("dataframe"):
+        with site.tracer.start_as_current_span("process_results", attributes={"properties": len(results)}):
+            builder = PropertyFrameBuilder(site.columns).extend(results)
+
+        with site.tracer.start_as_current_span("build_dataframe", attributes={"rows": len(builder)}):
+            properties_df = builder.build()
+
+    properties_df.attrs.update(site.cancellation.report())
+    return properties_df
+
+
+def _profiler(profile: bool | str) -> Profiler | None:
+    if not profile:
+        return None
+
+    if profile is True:
+        profile = f"HomeHarvest_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.prof"
+
+    return Profiler(profile)
+
+
+def _cancellation_token(
+    timeout: float | None, deadline: datetime.datetime | float | None, cancellation_token: CancellationToken | None
+) -> CancellationToken:
+    if cancellation_token is None:
+        return CancellationToken(timeout=timeout, deadline=deadline)
+
+    if timeout is not None or deadline is not None:
+        raise ValueError("Pass the timeout or deadline to the CancellationToken instead.")
+
+    return cancellation_token
+
+
+def scrape_properties(
+    locations: list[str], max_workers: int = 10, return_stats: bool = False, profile: bool | str = False, **kwargs
+) -> pd.DataFrame | tuple[pd.DataFrame, MetricsCollector]:
+    """
+    Scrapes several locations concurrently and returns one combined DataFrame with a search_location column.
+    Accepts the same parameters as scrape_property.
+    :param locations: Locations to search (e.g. ["Dallas, TX", "75201"])
+    :param max_workers: Maximum number of requests in flight at once, shared by all locations.
+    Extra property data is fetched once per unique property_id, after all locations have been searched, so properties
+    found in overlapping locations (e.g. a city and one of its zip codes) are only enriched once. The metrics & profile
+    cover every location.
+    """
+    if isinstance(kwargs.get("proxy"), list):  #: one pool shared by every location
+        kwargs["proxy"] = ProxyPool(kwargs["proxy"], pool_size=(kwargs.get("scheduler") or DEFAULT_SCHEDULER).workers)
+
+    metrics = kwargs["metrics"] = kwargs.get("metrics") or MetricsCollector()
+    profiler = _profiler(profile)
+
+    cancellation_token = kwargs["cancellation_token"] = _cancellation_token(
+        kwargs.pop("timeout", None), kwargs.pop("deadline", None), kwargs.get("cancellation_token")
+    )
+
+    request_semaphore = threading.BoundedSemaphore(max_workers)
+    scraper_inputs = [
+        replace(_scraper_input(location, **kwargs), request_semaphore=request_semaphore, profiler=profiler)
+        for location in locations
+    ]
+
+    sites = [RealtorScraper(replace(scraper_input, extra_property_data=False)) for scraper_input in scraper_inputs]
+    search = RealtorScraper.search if profiler is None else profiler.wrap(RealtorScraper.search)
+    with profiler or nullcontext():
+        with metrics.stage("search"), ThreadPoolExecutor(max_workers=max_workers) as executor:
+            location_results = list(executor.map(search, sites))
+
+        if scraper_inputs and scraper_inputs[0].extra_property_data:
+            #: journaled as a job of its own, since every location's journal is cleared once its search completes
+            enrichment_job = "enrich:" + ",".join(sorted(site.checkpoint_job for site in sites))
+            enricher = RealtorScraper(replace(scraper_inputs[0], checkpoint_job=enrichment_job))
+            with metrics.stage("enrich"):
+                skipped_details = enricher.enrich_properties(
+                    [realty_property for results in location_results for realty_property in results if realty_property]
+                )
+            cancellation_token.skip(details=skipped_details)
+            enricher._clear_checkpoint()
+
+        with metrics.stage("dataframe"):
+            properties_dfs = []
+            for location, results in zip(locations, location_results):
+                if not (properties_df := process_results(results, scraper_inputs[0].columns)).empty:
+                    properties_df.insert(0, "search_location", location)
+                    properties_dfs.append(properties_df)
+
+            properties_df = pd.concat(properties_dfs, ignore_index=True) if properties_dfs else pd.DataFrame()
+
+    properties_df.attrs.update(cancellation_token.report())
+
+    return (properties_df, metrics) if return_stats else properties_df
+
+
+def scrape_property_arrow(
+    location: str, return_stats: bool = False, profile: bool | str = False, **kwargs
+) -> "pyarrow.Table | tuple[pyarrow.Table, MetricsCollector]":
     """
+    Same as scrape_property, but returns a typed pyarrow.Table (see homeharvest.arrow) instead of a DataFrame. The
+    schema metadata holds the partial & skipped_* counts of df.attrs.
+    """
+    scraper_input = replace(_scraper_input(location, **kwargs), profiler=_profiler(profile))
+    site = RealtorScraper(scraper_input)
+
+    with scraper_input.profiler or nullcontext():
+        with site.metrics.stage("search"):
+            results = site.search()
+
+        with site.metrics.stage("arrow"):
+            table = to_arrow(results, site.columns)
+
+    table = table.replace_schema_metadata(
+        {key: str(value).lower() for key, value in site.cancellation.report().items()}
+    )
+    return (table, scraper_input.metrics) if return_stats else table
+
+
+def scrape_property_arrow_stream(location: str, **kwargs) -> Iterator["pyarrow.Table"]:
+    """
+    Same as scrape_property_stream, but yields one typed pyarrow.Table per search page, e.g. to write each page as a
+    Parquet row group with ParquetStreamWriter.
+    """
+    site = RealtorScraper(_scraper_input(location, **kwargs))
+
+    for page in site.iter_pages():
+        if (table := to_arrow(page, site.columns)).num_rows:
+            yield table
+
+
+def iter_properties(location: str, **kwargs) -> Iterator[Property]:
+    """
+    Yields properties page by page (200 per page) as each page is fetched & enriched, instead of waiting for the
+    whole search. Accepts the same parameters as scrape_property, plus max_in_flight_pages (default 10) to bound
+    how many pages are fetched ahead of the consumer.
+    """
+    site = RealtorScraper(_scraper_input(location, **kwargs))
+
+    for page in site.iter_pages():
+        yield from filter(None, page)
+
+
+def scrape_property_stream(location: str, **kwargs) -> Iterator[pd.DataFrame]:
+    """
+    Same as iter_properties, but yields one DataFrame chunk (in scrape_property's column order) per search page.
+    """
+    site = RealtorScraper(_scraper_input(location, **kwargs))
+
+    for page in site.iter_pages():
+        if not (chunk := process_results(page, site.columns)).empty:
+            yield chunk
+
+
+def _scraper_input(
+    location: str,
+    listing_type: str = "for_sale",
+    property_type: list[str] | None = None,
+    radius: float = None,
+    mls_only: bool = False,
+    past_days: int = None,
+    proxy: str | list[str] | ProxyPool = None,
+    date_from: str = None,
+    date_to: str = None,
+    foreclosure: bool = None,
+    extra_property_data: bool = True,
+    exclude_pending: bool = False,
+    limit: int = 10000,
+    extra_property_data_batch_size: int = 50,
+    max_in_flight_pages: int = 10,
+    cache: ResponseCache | str | bool | None = None,
+    location_resolver: LocationResolver | None = None,
+    details_cache: DetailsCache | str | None = None,
+    watermark_store: WatermarkStore | str | None = None,
+    auto_shard: bool = False,
+    rate_limiter: RateLimiter | None = None,
+    scheduler: Scheduler | None = None,
+    transport: Transport | None = None,
+    http2: bool = False,
+    json_decoder: str | JSONDecoder | None = None,
+    metrics: MetricsCollector | None = None,
+    tracer=None,
+    timeout: float | None = None,
+    deadline: datetime.datetime | float | None = None,
+    cancellation_token: CancellationToken | None = None,
+    checkpoint: Checkpoint | str | bool | None = None,
+    resume: bool = False,
+    price_min: int | None = None,
+    price_max: int | None = None,
+    beds_min: int | None = None,
+    beds_max: int | None = None,
+    sqft_min: int | None = None,
+    sqft_max: int | None = None,
+    lot_sqft_min: int | None = None,
+    lot_sqft_max: int | None = None,
+    property_filter: Callable[[Property], bool] | None = None,
+    columns: list[str] | None = None,
+) -> ScraperInput:
     validate_input(listing_type)
     validate_dates(date_from, date_to)
-    validate_limit(limit)
+    validate_limit(limit, auto_shard)
+    validate_columns(columns)
+    validate_ranges(
+        price=(price_min, price_max),
+        beds=(beds_min, beds_max),
+        sqft=(sqft_min, sqft_max),
+        lot_sqft=(lot_sqft_min, lot_sqft_max),
+    )
+
+    if columns is not None:  #: the extra property data requests only fill in these columns
+        extra_property_data = extra_property_data and not set(DETAILS_COLUMNS).isdisjoint(columns)
 
-    scraper_input = ScraperInput(
+    if isinstance(proxy, list):  #: one connection per worker of the scheduler, for each proxy
+        proxy = ProxyPool(proxy, pool_size=(scheduler or DEFAULT_SCHEDULER).workers)
+
+    if isinstance(proxy, ProxyPool):
+        if transport is not None:
+            raise ValueError("A proxy pool can't be combined with a transport.")
+
+        transport, proxy = proxy, None
+
+    if cache is True:
+        cache = ResponseCache()
+    elif isinstance(cache, str):
+        cache = ResponseCache(path=cache)
+
+    if isinstance(details_cache, str):
+        details_cache = DetailsCache(path=details_cache)
+
+    if isinstance(watermark_store, str):
+        watermark_store = WatermarkStore(path=watermark_store)
+
+    if checkpoint is True:
+        checkpoint = Checkpoint()
+    elif isinstance(checkpoint, str):
+        checkpoint = Checkpoint(path=checkpoint)
+    elif resume and not checkpoint:
+        raise ValueError("resume requires a checkpoint.")
+
+    return ScraperInput(
         location=location,
         listing_type=ListingType[listing_type.upper()],
         property_type=[SearchPropertyType[prop.upper()] for prop in property_type] if property_type else None,
@@ -54,18 +478,31 @@ def scrape_property(
         extra_property_data=extra_property_data,
         exclude_pending=exclude_pending,
         limit=limit,
+        auto_shard=auto_shard,
+        extra_property_data_batch_size=extra_property_data_batch_size,
+        max_in_flight_pages=max_in_flight_pages,
+        cache=cache or None,
+        location_resolver=location_resolver,
+        details_cache=details_cache,
+        watermark_store=watermark_store,
+        rate_limiter=rate_limiter,
+        scheduler=scheduler,
+        transport=transport,
+        http2=http2,
+        json_decoder=get_decoder(json_decoder),
+        metrics=metrics or MetricsCollector(),
+        tracer=tracer or NOOP_TRACER,
+        cancellation=_cancellation_token(timeout, deadline, cancellation_token),
+        checkpoint=checkpoint or None,
+        resume=resume,
+        price_min=price_min,
+        price_max=price_max,
+        beds_min=beds_min,
+        beds_max=beds_max,
+        sqft_min=sqft_min,
+        sqft_max=sqft_max,
+        lot_sqft_min=lot_sqft_min,
+        lot_sqft_max=lot_sqft_max,
+        property_filter=property_filter,
+        columns=columns,
     )
-
-    site = RealtorScraper(scraper_input)
-    results = site.search()
-
-    properties_dfs = [df for result in results if not (df := process_result(result)).empty]
-    if not properties_dfs:
-        return pd.DataFrame()
-
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore", category=FutureWarning)
-
-        return pd.concat(properties_dfs, ignore_index=True, axis=0)[ordered_properties].replace(
-            {"None": pd.NA, None: pd.NA, "": pd.NA}
-        )
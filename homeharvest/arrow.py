@@ -0,0 +1,206 @@
+"""
+homeharvest.arrow
+~~~~~~~~~~~~
+
+Typed Apache Arrow tables of properties (pip install homeharvest[arrow]). Unlike the DataFrame's object columns,
+numbers, dates & booleans get their own types, and tax_history, agent_phones, office_phones, alt_photos &
+nearby_schools are nested list/struct columns, so they survive a round trip through Parquet.
+"""
+
+from __future__ import annotations
+
+import datetime
+import os
+from typing import Iterable
+
+import pandas as pd
+
+from .core.scrapers.models import Property
+from .utils import ordered_properties, flatten_property
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = pq = None
+
+_INT_COLUMNS = {
+    "beds",
+    "full_baths",
+    "half_baths",
+    "sqft",
+    "year_built",
+    "days_on_mls",
+    "list_price",
+    "list_price_min",
+    "list_price_max",
+    "sold_price",
+    "estimated_value",
+    "lot_sqft",
+    "stories",
+    "parking_garage",
+}
+_FLOAT_COLUMNS = {"latitude", "longitude", "price_per_sqft", "hoa_fee", "tax", "assessed_value"}
+_DATE_COLUMNS = {"list_date", "last_sold_date"}
+_BOOL_COLUMNS = {"new_construction"}
+_PHONES_COLUMNS = {"agent_phones", "office_phones"}
+_STRING_LIST_COLUMNS = {"alt_photos", "nearby_schools"}
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise ImportError("Arrow output requires pyarrow, install it with: pip install homeharvest[arrow]")
+
+
+def _column_type(column: str) -> pa.DataType:
+    if column in _INT_COLUMNS:
+        return pa.int64()
+    if column in _FLOAT_COLUMNS:
+        return pa.float64()
+    if column in _DATE_COLUMNS:
+        return pa.date32()
+    if column in _BOOL_COLUMNS:
+        return pa.bool_()
+    if column in _PHONES_COLUMNS:
+        return pa.list_(
+            pa.struct(
+                [
+                    ("number", pa.string()),
+                    ("type", pa.string()),
+                    ("primary", pa.bool_()),
+                    ("ext", pa.string()),
+                ]
+            )
+        )
+    if column in _STRING_LIST_COLUMNS:
+        return pa.list_(pa.string())
+    if column == "tax_history":
+        return pa.list_(
+            pa.struct(
+                [
+                    ("year", pa.int32()),
+                    ("tax", pa.float64()),
+                    (
+                        "assessment",
+                        pa.struct([("building", pa.float64()), ("land", pa.float64()), ("total", pa.float64())]),
+                    ),
+                ]
+            )
+        )
+
+    return pa.string()
+
+
+def arrow_schema(columns: list[str] | None = None) -> pa.Schema:
+    """
+    The schema of to_arrow's tables, for the given columns (all of ordered_properties by default)
+    """
+    _require_pyarrow()
+
+    return pa.schema([(column, _column_type(column)) for column in columns or ordered_properties])
+
+
+def _to_int(value):
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"{value} is not an integer, its column should be a float column")
+
+    return None if value is None else int(value)
+
+
+def _to_date(value):
+    if value is None or isinstance(value, datetime.date):
+        return value
+
+    try:
+        return datetime.date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def _to_string(value):
+    return None if value is None else str(value)
+
+
+def _arrow_row(result: Property) -> dict:
+    """
+    flatten_property's row, with the lists flatten_property joins into strings kept as lists
+    """
+    row = flatten_property(result)
+    row["alt_photos"] = result.description.alt_photos if result.description else None
+    row["nearby_schools"] = sorted(set(filter(None, result.nearby_schools))) if result.nearby_schools else None
+
+    return {column: None if value is pd.NA else value for column, value in row.items()}
+
+
+def _convert(column: str, values: list) -> list:
+    if column in _INT_COLUMNS:
+        return [_to_int(value) for value in values]
+    if column in _FLOAT_COLUMNS:
+        return [None if value is None else float(value) for value in values]
+    if column in _DATE_COLUMNS:
+        return [_to_date(value) for value in values]
+    if pa.types.is_string(_column_type(column)):
+        return [_to_string(value) for value in values]
+
+    return values  #: booleans & nested columns, which pyarrow converts as they are
+
+
+def to_arrow(results: Iterable[Property], columns: list[str] | None = None) -> pa.Table:
+    """
+    A typed pyarrow.Table of the properties, in ordered_properties order (or the order of the given columns)
+    """
+    schema = arrow_schema(columns)
+    values: dict[str, list] = {column: [] for column in schema.names}
+
+    for result in results:
+        if not result:
+            continue
+
+        row = _arrow_row(result)
+        for column, column_values in values.items():
+            column_values.append(row[column])
+
+    return pa.Table.from_arrays(
+        [pa.array(_convert(field.name, values[field.name]), type=field.type) for field in schema],
+        schema=schema,
+    )
+
+
+class ParquetStreamWriter:
+    """
+    Writes properties to a Parquet file one row group at a time (e.g. one per search page), so the file is filled in
+    as pages complete and only the current page is held in memory.
+    :param path: Path of the Parquet file.
+    :param columns: Only writes these columns, in this order.
+    :param compression: Parquet compression codec.
+    """
+
+    def __init__(self, path: str, columns: list[str] | None = None, compression: str = "zstd"):
+        self.path = os.path.expanduser(path)
+        self.schema = arrow_schema(columns)
+        self.rows = 0
+        self._writer = pq.ParquetWriter(self.path, self.schema, compression=compression)
+
+    def __enter__(self) -> ParquetStreamWriter:
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        self.close()
+        return False
+
+    def write(self, table: pa.Table | Iterable[Property]) -> int:
+        """
+        Writes a table of to_arrow (or the properties to convert) as one row group, and returns how many rows were
+        written
+        """
+        if not isinstance(table, pa.Table):
+            table = to_arrow(table, self.schema.names)
+
+        if table.num_rows:
+            self._writer.write_table(table)
+            self.rows += table.num_rows
+
+        return table.num_rows
+
+    def close(self) -> None:
+        self._writer.close()
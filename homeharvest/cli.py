@@ -1,6 +1,15 @@
 import argparse
 import datetime
-from homeharvest import scrape_property
+from homeharvest import scrape_property_stream, scrape_property_arrow_stream, ParquetStreamWriter
+from homeharvest.writers import CsvStreamWriter, JsonLinesStreamWriter, ExcelStreamWriter
+
+#: output format -> (file extension, writer)
+OUTPUTS = {
+    "excel": ("xlsx", ExcelStreamWriter),
+    "csv": ("csv", CsvStreamWriter),
+    "jsonl": ("jsonl", JsonLinesStreamWriter),
+    "parquet": ("parquet", ParquetStreamWriter),
+}
 
 
 def main():
@@ -21,7 +30,7 @@ def main():
         "--output",
         type=str,
         default="excel",
-        choices=["excel", "csv"],
+        choices=list(OUTPUTS),
         help="Output format",
     )
 
@@ -58,27 +67,27 @@ def main():
 
     args = parser.parse_args()
 
-    result = scrape_property(
-        args.location,
-        args.listing_type,
+    if not args.filename:
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        args.filename = f"HomeHarvest_{timestamp}"
+
+    output_filename = f"{args.filename}.{OUTPUTS[args.output][0]}"
+    search = dict(
+        listing_type=args.listing_type,
         radius=args.radius,
         proxy=args.proxy,
         mls_only=args.mls_only,
         past_days=args.days,
     )
 
-    if not args.filename:
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        args.filename = f"HomeHarvest_{timestamp}"
+    #: each search page is written (and flushed) as soon as it completes, so only one page is held in memory
+    stream = scrape_property_arrow_stream if args.output == "parquet" else scrape_property_stream
+    with OUTPUTS[args.output][1](output_filename) as writer:
+        for page, chunk in enumerate(stream(args.location, **search), start=1):
+            writer.write(chunk)
+            print(f"Page {page}: {writer.rows} properties written to {output_filename}", flush=True)
 
-    if args.output == "excel":
-        output_filename = f"{args.filename}.xlsx"
-        result.to_excel(output_filename, index=False)
-        print(f"Excel file saved as {output_filename}")
-    elif args.output == "csv":
-        output_filename = f"{args.filename}.csv"
-        result.to_csv(output_filename, index=False)
-        print(f"CSV file saved as {output_filename}")
+    print(f"Saved {writer.rows} properties to {output_filename}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,302 @@
+"""
+homeharvest.core.cache
+~~~~~~~~~~~~
+
+Key/value caches used to avoid repeating realtor.com requests, and the response cache built on top of them.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict, defaultdict
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+
+class MemoryCache:
+    """
+    In-process LRU cache holding at most max_entries values
+    """
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[object, float | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            if (entry := self._entries.get(key)) is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: float | None = None) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl if ttl is not None else None)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def set_many(self, values: dict[str, object], ttl: float | None = None) -> None:
+        for key, value in values.items():
+            self.set(key, value, ttl=ttl)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache:
+    """
+    Persistent cache stored in a SQLite file. Values are JSON encoded & zlib compressed, and the least recently used
+    entries are evicted once the compressed values exceed max_size bytes.
+    """
+
+    #: seconds between the writes of an entry's access time, so reading an entry rarely writes to the file
+    ACCESS_RESOLUTION = MINUTE
+
+    def __init__(self, path: str, max_size: int = 512 * 1024 * 1024):
+        self.path = os.path.expanduser(path)
+        self.max_size = max_size
+
+        if directory := os.path.dirname(self.path):
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+        self._size = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, expires_at, accessed_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, expires_at, accessed_at = row
+            now = time.time()
+            if expires_at is not None and expires_at < now:
+                self._delete(key)
+                return None
+
+            if now - accessed_at >= self.ACCESS_RESOLUTION:
+                self._connection.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+
+        return json.loads(zlib.decompress(value))
+
+    def set(self, key: str, value, ttl: float | None = None) -> None:
+        compressed = zlib.compress(json.dumps(value, separators=(",", ":")).encode())
+        now = time.time()
+
+        with self._lock:
+            self._delete(key)
+            self._connection.execute(
+                "INSERT INTO entries (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, compressed, len(compressed), now + ttl if ttl is not None else None, now),
+            )
+            self._size += len(compressed)
+
+            if self._size > self.max_size:
+                self._evict()
+
+    def set_many(self, values: dict[str, object], ttl: float | None = None) -> None:
+        """
+        Sets many values in a single transaction, instead of one per value
+        """
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        rows = []
+        for key, value in values.items():
+            compressed = zlib.compress(json.dumps(value, separators=(",", ":")).encode())
+            rows.append((key, compressed, len(compressed), expires_at, now))
+
+        with self._lock:
+            size = self._size
+            self._connection.execute("BEGIN")
+            try:
+                for key, *_ in rows:
+                    self._delete(key)
+
+                self._connection.executemany(
+                    "INSERT INTO entries (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)", rows
+                )
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                self._size = size
+                raise
+
+            self._size += sum(row[2] for row in rows)
+
+            if self._size > self.max_size:
+                self._evict()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._delete(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM entries")
+            self._size = 0
+
+    def _delete(self, key: str) -> None:
+        row = self._connection.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+        if row:
+            self._connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._size -= row[0]
+
+    def _evict(self) -> None:
+        self._connection.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),))
+
+        rows = self._connection.execute("SELECT key, size FROM entries ORDER BY accessed_at DESC").fetchall()
+        kept_size, evicted = 0, []
+        for key, size in rows:
+            if kept_size + size <= self.max_size:
+                kept_size += size
+            else:
+                evicted.append((key,))
+
+        self._connection.executemany("DELETE FROM entries WHERE key = ?", evicted)
+        self._size = kept_size
+
+
+class ResponseCache:
+    """
+    Caches decoded realtor.com responses, keyed by endpoint, url & the normalized GraphQL query and variables (or the
+    query string parameters of GET requests). Each endpoint has its own TTL, in seconds.
+    :param path: SQLite file to persist the responses to; kept in memory if None.
+    """
+
+    DEFAULT_PATH = "~/.cache/homeharvest/responses.sqlite"
+    DEFAULT_TTLS = {
+        "location": 30 * DAY,
+        "search": 6 * HOUR,
+        "home": DAY,
+        "details": 7 * DAY,
+    }
+
+    def __init__(
+        self,
+        path: str | None = DEFAULT_PATH,
+        ttls: dict[str, float] | None = None,
+        max_size: int = 512 * 1024 * 1024,
+        backend: MemoryCache | SQLiteCache | None = None,
+    ):
+        self.backend = backend or (SQLiteCache(path, max_size=max_size) if path else MemoryCache())
+        self.ttls = self.DEFAULT_TTLS | (ttls or {})
+        self.hits: defaultdict[str, int] = defaultdict(int)
+        self.misses: defaultdict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(endpoint: str, url: str, payload: dict | None = None, params: dict | None = None) -> str:
+        request = {"endpoint": endpoint, "url": url}
+        if payload is not None:
+            request["query"] = re.sub(r"\s+", " ", payload.get("query", "")).strip()
+            request["variables"] = payload.get("variables")
+        if params is not None:
+            request["params"] = params
+
+        return hashlib.sha256(_dumps(request).encode()).hexdigest()
+
+    def get(self, endpoint: str, key: str):
+        value = self.backend.get(key) if self.ttls.get(endpoint) is not None else None
+
+        with self._lock:
+            if value is not None:
+                self.hits[endpoint] += 1
+            else:
+                self.misses[endpoint] += 1
+
+        return value
+
+    def set(self, endpoint: str, key: str, value) -> None:
+        if (ttl := self.ttls.get(endpoint)) is not None:
+            self.backend.set(key, value, ttl=ttl)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        with self._lock:
+            return {
+                endpoint: {"hits": self.hits[endpoint], "misses": self.misses[endpoint]}
+                for endpoint in sorted(set(self.hits) | set(self.misses))
+            }
+
+
+class DetailsCache:
+    """
+    Caches the extra property details (schools, tax history & assessed value) of each property_id. The details are
+    independent of listing type, so a single cache can be shared by every search and across runs.
+    :param path: SQLite file to persist the details to; kept in memory if not set.
+    :param ttl: Seconds before the details of a property are fetched again.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        ttl: float = 180 * DAY,
+        backend: MemoryCache | SQLiteCache | None = None,
+    ):
+        self.backend = backend or (SQLiteCache(path) if path else MemoryCache(max_entries=1_000_000))
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get_many(self, property_ids: list[str]) -> dict[str, dict]:
+        prop_details = {
+            property_id: details
+            for property_id in property_ids
+            if (details := self.backend.get(property_id)) is not None
+        }
+
+        with self._lock:
+            self.hits += len(prop_details)
+            self.misses += len(property_ids) - len(prop_details)
+
+        return prop_details
+
+    def set_many(self, prop_details: dict[str, dict]) -> None:
+        self.backend.set_many(
+            {property_id: details for property_id, details in prop_details.items() if details}, ttl=self.ttl
+        )
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
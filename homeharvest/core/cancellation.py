@@ -0,0 +1,139 @@
+"""
+homeharvest.core.cancellation
+~~~~~~~~~~~~
+
+Bounds a scrape in time. Once its token is cancelled, or its deadline passes, a scrape stops scheduling search pages &
+extra property data, drops the work still queued, and returns what had finished, flagged as partial.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from datetime import datetime
+from typing import Iterable, Iterator
+
+from ..exceptions import ScrapeCancelled
+
+
+class CancellationToken:
+    """
+    :param timeout: Seconds from now after which the token is cancelled.
+    :param deadline: Time (a datetime or a time.time() timestamp) after which the token is cancelled.
+    cancel() can be called from any thread. The token also counts what the scrape skipped because it was cancelled.
+    """
+
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, timeout: float | None = None, deadline: datetime | float | None = None):
+        self.deadline: float | None = None  #: time.monotonic() based
+
+        if timeout is not None:
+            self.deadline = time.monotonic() + timeout
+
+        if deadline is not None:
+            if isinstance(deadline, datetime):
+                deadline = deadline.timestamp()
+
+            deadline = time.monotonic() + (deadline - time.time())
+            self.deadline = deadline if self.deadline is None else min(self.deadline, deadline)
+
+        self.skipped = {"pages": 0, "shards": 0, "details": 0}
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set() or (self.deadline is not None and time.monotonic() >= self.deadline)
+
+    def remaining(self) -> float | None:
+        """
+        Seconds left before the deadline, or None without one
+        """
+        if self.deadline is None:
+            return None
+
+        return max(0.0, self.deadline - time.monotonic())
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancelled:
+            raise ScrapeCancelled("The scrape was cancelled or ran out of time.")
+
+    def request_timeout(self, timeout: float) -> float:
+        """
+        The timeout of a request sent now, so it doesn't outlast the deadline
+        """
+        if (remaining := self.remaining()) is None:
+            return timeout
+
+        return max(min(timeout, remaining), 0.01)
+
+    def sleep(self, seconds: float) -> None:
+        """
+        Sleeps, waking up early if the token is cancelled
+        """
+        if (remaining := self.remaining()) is not None:
+            seconds = min(seconds, remaining)
+
+        self._cancelled.wait(seconds)
+        self.raise_if_cancelled()
+
+    def wait(self, futures: Iterable[Future]) -> set[Future]:
+        """
+        Waits until at least one future is done, or the token is cancelled, and returns the done futures
+        """
+        while True:
+            done, _ = wait(futures, timeout=self.POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            if done or self.cancelled:
+                return done
+
+    def result(self, future: Future):
+        """
+        Waits for the future's result, or raises ScrapeCancelled (and cancels the future) if the token is cancelled first
+        """
+        if not self.wait([future]):
+            future.cancel()
+            self.raise_if_cancelled()
+
+        return future.result()
+
+    def as_completed(self, futures: Iterable[Future]) -> Iterator[Future]:
+        """
+        Yields the futures as they complete, until the token is cancelled. The futures left are then cancelled.
+        """
+        pending = set(futures)
+        try:
+            while pending and not self.cancelled:
+                done = self.wait(pending)
+                pending -= done
+                yield from done
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def skip(self, pages: int = 0, shards: int = 0, details: int = 0) -> None:
+        with self._lock:
+            self.skipped["pages"] += pages
+            self.skipped["shards"] += shards
+            self.skipped["details"] += details
+
+    @property
+    def partial(self) -> bool:
+        with self._lock:
+            return any(self.skipped.values())
+
+    def report(self) -> dict:
+        """
+        Whether the results are partial, and how many search pages, shards & extra property data were skipped
+        """
+        with self._lock:
+            return {
+                "partial": any(self.skipped.values()),
+                "skipped_pages": self.skipped["pages"],
+                "skipped_shards": self.skipped["shards"],
+                "skipped_details": self.skipped["details"],
+            }
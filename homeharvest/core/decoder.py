@@ -0,0 +1,70 @@
+"""
+homeharvest.core.decoder
+~~~~~~~~~~~~
+
+Decodes JSON responses straight from their raw bytes with the fastest decoder installed: orjson, then msgspec, then
+the standard library. orjson & msgspec decode faster than json, so worker threads hold the GIL for less time per
+search page. Decoding errors are raised as json.JSONDecodeError, which the scrapers retry on.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Callable
+
+JSONDecoder = Callable[[bytes], Any]
+
+
+def _orjson_decoder() -> JSONDecoder:
+    import orjson
+
+    return orjson.loads  #: orjson.JSONDecodeError is a json.JSONDecodeError
+
+
+def _msgspec_decoder() -> JSONDecoder:
+    import msgspec
+
+    decoder = msgspec.json.Decoder()
+
+    def loads(content: bytes):
+        try:
+            return decoder.decode(content)
+        except msgspec.DecodeError as error:
+            raise json.JSONDecodeError(str(error), "", 0) from error
+
+    return loads
+
+
+def _json_decoder() -> JSONDecoder:
+    return json.loads
+
+
+DECODERS: dict[str, Callable[[], JSONDecoder]] = {
+    "orjson": _orjson_decoder,
+    "msgspec": _msgspec_decoder,
+    "json": _json_decoder,
+}
+
+
+def get_decoder(decoder: str | JSONDecoder | None = None) -> JSONDecoder:
+    """
+    :param decoder: "orjson", "msgspec", "json", a function decoding bytes, or None for the fastest decoder installed.
+    """
+    if callable(decoder):
+        return decoder
+
+    if decoder is not None:
+        if decoder not in DECODERS:
+            raise ValueError(f"Unknown JSON decoder '{decoder}', expected one of {', '.join(DECODERS)}.")
+
+        return DECODERS[decoder]()
+
+    for load_decoder in DECODERS.values():
+        try:
+            return load_decoder()
+        except ImportError:
+            continue
+
+
+#: used by every scrape, unless a scrape is given its own json_decoder
+DEFAULT_DECODER = get_decoder()
@@ -0,0 +1,164 @@
+"""
+homeharvest.core.metrics
+~~~~~~~~~~~~
+
+Request metrics (counts, status codes, bytes, retries & latency histograms) per endpoint & GraphQL query name, plus the
+time spent in each stage of a scrape, exportable in the Prometheus text format.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_NAME = re.compile(r"^\s*query\s+(\w+)")
+
+
+def query_name(request_kwargs: dict) -> str:
+    """
+    The name of a GraphQL request's operation (e.g. Home_search, GetHome), or "" for other requests
+    """
+    payload = request_kwargs.get("json")
+    if not isinstance(payload, dict) or not (match := QUERY_NAME.match(payload.get("query") or "")):
+        return ""
+
+    return match.group(1)
+
+
+class RequestMetrics:
+    def __init__(self, buckets: tuple[float, ...]):
+        self.requests = 0
+        self.statuses: defaultdict[str, int] = defaultdict(int)
+        self.response_bytes = 0
+        self.retries = 0
+        self.latency_sum = 0.0
+        self.latency_buckets = [0] * (len(buckets) + 1)  #: the last bucket is +Inf
+
+    def to_dict(self, buckets: tuple[float, ...]) -> dict:
+        return {
+            "requests": self.requests,
+            "statuses": dict(self.statuses),
+            "response_bytes": self.response_bytes,
+            "retries": self.retries,
+            "latency_sum": round(self.latency_sum, 6),
+            "latency_buckets": dict(zip([*map(str, buckets), "+Inf"], self.latency_buckets)),
+        }
+
+
+class MetricsCollector:
+    """
+    Collects the metrics of every scrape it's passed to (metrics=), e.g. to export them for a dashboard.
+    :param buckets: Upper bounds, in seconds, of the request latency histogram buckets.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.requests: defaultdict[tuple[str, str], RequestMetrics] = defaultdict(lambda: RequestMetrics(self.buckets))
+        self.cache_hits: defaultdict[tuple[str, str], int] = defaultdict(int)
+        self.stages: defaultdict[str, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def record_request(
+        self,
+        endpoint: str,
+        query: str,
+        status_code: int | None,
+        latency: float,
+        response_bytes: int = 0,
+        retry: bool = False,
+    ) -> None:
+        with self._lock:
+            metrics = self.requests[(endpoint, query)]
+            metrics.requests += 1
+            metrics.statuses[str(status_code) if status_code is not None else "error"] += 1
+            metrics.response_bytes += response_bytes
+            metrics.retries += retry
+            metrics.latency_sum += latency
+            metrics.latency_buckets[bisect_left(self.buckets, latency)] += 1
+
+    def record_cache_hit(self, endpoint: str, query: str) -> None:
+        with self._lock:
+            self.cache_hits[(endpoint, query)] += 1
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Adds the time spent in the block to the named stage (e.g. search, dataframe)
+        """
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.stages[name] += time.perf_counter() - started_at
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": {
+                    f"{endpoint}:{query}" if query else endpoint: metrics.to_dict(self.buckets)
+                    for (endpoint, query), metrics in sorted(self.requests.items())
+                },
+                "cache_hits": {
+                    f"{endpoint}:{query}" if query else endpoint: hits
+                    for (endpoint, query), hits in sorted(self.cache_hits.items())
+                },
+                "stages": {name: round(seconds, 6) for name, seconds in sorted(self.stages.items())},
+            }
+
+    def to_prometheus(self) -> str:
+        """
+        The metrics in the Prometheus text exposition format
+        """
+        lines = []
+
+        def metric(name: str, metric_type: str, description: str) -> None:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {metric_type}")
+
+        with self._lock:
+            requests = sorted(self.requests.items())
+
+            metric("homeharvest_requests_total", "counter", "Requests sent, by endpoint, query & status code.")
+            for (endpoint, query), metrics in requests:
+                for status, count in sorted(metrics.statuses.items()):
+                    lines.append(f"homeharvest_requests_total{{{_labels(endpoint, query, status=status)}}} {count}")
+
+            metric("homeharvest_response_bytes_total", "counter", "Response body bytes received.")
+            for (endpoint, query), metrics in requests:
+                lines.append(f"homeharvest_response_bytes_total{{{_labels(endpoint, query)}}} {metrics.response_bytes}")
+
+            metric("homeharvest_retries_total", "counter", "Requests retried after a 429/403 response.")
+            for (endpoint, query), metrics in requests:
+                lines.append(f"homeharvest_retries_total{{{_labels(endpoint, query)}}} {metrics.retries}")
+
+            metric("homeharvest_request_duration_seconds", "histogram", "Request latency.")
+            for (endpoint, query), metrics in requests:
+                cumulative = 0
+                for upper_bound, count in zip([*map(str, self.buckets), "+Inf"], metrics.latency_buckets):
+                    cumulative += count
+                    labels = _labels(endpoint, query, le=upper_bound)
+                    lines.append(f"homeharvest_request_duration_seconds_bucket{{{labels}}} {cumulative}")
+
+                labels = _labels(endpoint, query)
+                lines.append(f"homeharvest_request_duration_seconds_sum{{{labels}}} {metrics.latency_sum}")
+                lines.append(f"homeharvest_request_duration_seconds_count{{{labels}}} {metrics.requests}")
+
+            metric("homeharvest_cache_hits_total", "counter", "Responses served from the response cache.")
+            for (endpoint, query), hits in sorted(self.cache_hits.items()):
+                lines.append(f"homeharvest_cache_hits_total{{{_labels(endpoint, query)}}} {hits}")
+
+            metric("homeharvest_stage_seconds_total", "counter", "Time spent in each stage of a scrape.")
+            for name, seconds in sorted(self.stages.items()):
+                lines.append(f'homeharvest_stage_seconds_total{{stage="{name}"}} {seconds}')
+
+        return "\n".join(lines) + "\n"
+
+
+def _labels(endpoint: str, query: str, **labels: str) -> str:
+    return ",".join(f'{name}="{value}"' for name, value in {"endpoint": endpoint, "query": query, **labels}.items())
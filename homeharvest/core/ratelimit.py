@@ -0,0 +1,180 @@
+"""
+homeharvest.core.ratelimit
+~~~~~~~~~~~~
+
+Process-wide, per-host rate limiting. Each host gets a token bucket (requests per second) and a concurrency window,
+both adjusted with AIMD: they grow additively while requests succeed quickly, and are halved when the host answers
+429/403, at which point every request to that host waits out a shared backoff instead of retrying on its own.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from urllib.parse import urlsplit
+
+THROTTLED_STATUS_CODES = (429, 403)
+
+
+class HostLimiter:
+    """
+    :param rate: Initial requests per second.
+    :param concurrency: Initial number of requests in flight at once.
+    :param latency_target: Seconds above which a response is treated as a sign of congestion.
+    :param cooldown: Seconds every request waits after the host throttles, doubled for each consecutive throttle.
+    """
+
+    POLL_INTERVAL = 0.05
+    MAX_BACKOFF = 30.0
+
+    def __init__(
+        self,
+        rate: float = 20.0,
+        min_rate: float = 0.5,
+        max_rate: float = 100.0,
+        concurrency: int = 20,
+        max_concurrency: int = 64,
+        latency_target: float = 5.0,
+        cooldown: float = 1.0,
+    ):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.concurrency = float(concurrency)
+        self.max_concurrency = max_concurrency
+        self.latency_target = latency_target
+        self.cooldown = cooldown
+
+        self.tokens = 1.0
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+
+        self._consecutive_throttles = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """
+        Takes a token & a concurrency slot if both are available and returns 0, otherwise returns the number of
+        seconds to wait before trying again
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+
+            self.tokens = min(max(self.rate, 1.0), self.tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+
+            if self.in_flight >= int(self.concurrency):
+                return self.POLL_INTERVAL
+
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rate
+
+            self.tokens -= 1
+            self.in_flight += 1
+            return 0.0
+
+    def acquire(self) -> float:
+        """
+        Blocks until the request may be sent, and returns the time it was sent at (to pass to release)
+        """
+        while (delay := self.try_acquire()) > 0:
+            time.sleep(delay)
+
+        return time.monotonic()
+
+    def release(self, started_at: float, status_code: int | None) -> None:
+        """
+        Frees the request's concurrency slot & adjusts the rate from its status code (None if it failed) and latency
+        """
+        now = time.monotonic()
+        latency = now - started_at
+
+        with self._lock:
+            self.in_flight -= 1
+            self.requests += 1
+
+            if status_code in THROTTLED_STATUS_CODES:
+                self.throttled += 1
+                self._consecutive_throttles += 1
+
+                #: requests already in flight when the host started throttling only count once
+                if now - self._last_decrease >= self.cooldown:
+                    self._decrease(now, factor=0.5)
+
+                backoff = min(self.MAX_BACKOFF, self.cooldown * 2 ** (self._consecutive_throttles - 1))
+                self._paused_until = max(self._paused_until, now + backoff)
+                self._updated_at = self._paused_until
+                self.tokens = 0.0
+            elif status_code is None or latency > self.latency_target:
+                if now - self._last_decrease >= self.cooldown:
+                    self._decrease(now, factor=0.9)
+            else:
+                self._consecutive_throttles = 0
+                self.rate = min(self.max_rate, self.rate + 1 / self.rate)
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+
+    def _decrease(self, now: float, factor: float) -> None:
+        self.rate = max(self.min_rate, self.rate * factor)
+        self.concurrency = max(1.0, self.concurrency * factor)
+        self._last_decrease = now
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rate": round(self.rate, 2),
+                "concurrency": int(self.concurrency),
+                "in_flight": self.in_flight,
+                "requests": self.requests,
+                "throttled": self.throttled,
+            }
+
+
+class Unlimited:
+    """
+    Stands in for a HostLimiter when requests are paced elsewhere
+    """
+
+    def try_acquire(self) -> float:
+        return 0.0
+
+    def acquire(self) -> float:
+        return time.monotonic()
+
+    def release(self, started_at: float, status_code: int | None) -> None:
+        pass
+
+
+class RateLimiter:
+    """
+    Holds one HostLimiter per host, created on first use with the given HostLimiter options
+    """
+
+    def __init__(self, **host_options):
+        self.host_options = host_options
+        self.hosts: dict[str, HostLimiter] = {}
+        self._lock = threading.Lock()
+
+    def for_url(self, url: str) -> HostLimiter:
+        host = urlsplit(url).hostname or ""
+
+        with self._lock:
+            if (host_limiter := self.hosts.get(host)) is None:
+                host_limiter = self.hosts[host] = HostLimiter(**self.host_options)
+
+        return host_limiter
+
+    def stats(self) -> dict[str, dict]:
+        with self._lock:
+            hosts = dict(self.hosts)
+
+        return {host: host_limiter.stats() for host, host_limiter in sorted(hosts.items())}
+
+
+#: shared by every search in the process, unless a search is given its own rate_limiter
+DEFAULT_RATE_LIMITER = RateLimiter()
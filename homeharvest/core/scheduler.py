@@ -0,0 +1,112 @@
+"""
+homeharvest.core.scheduler
+~~~~~~~~~~~~
+
+Long-lived worker threads shared by every search in the process, so the number of threads stays the same however many
+pages & properties are scraped. Search pages and extra property data batches have their own workers & queues.
+"""
+
+from __future__ import annotations
+
+import itertools
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable
+
+PRIORITY_FIRST_PAGE = 0
+PRIORITY_DEFAULT = 1
+
+
+class WorkerPool:
+    """
+    Runs tasks on a fixed number of daemon threads, started on first use, in priority order (lowest first) then
+    submission order. If max_queued is set, submit blocks while that many tasks are waiting for a worker.
+    """
+
+    def __init__(self, name: str, workers: int, max_queued: int | None = None):
+        self.name = name
+        self.workers = workers
+        self.active = 0
+
+        self._tasks: queue.PriorityQueue = queue.PriorityQueue()
+        self._slots = threading.BoundedSemaphore(max_queued) if max_queued else None
+        self._sequence = itertools.count()
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable, *args, priority: int = PRIORITY_DEFAULT, **kwargs) -> Future:
+        self._start()
+
+        if self._slots is not None:
+            self._slots.acquire()
+
+        future = Future()
+        self._tasks.put((priority, next(self._sequence), future, fn, args, kwargs))
+
+        return future
+
+    def _start(self) -> None:
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f"{self.name}-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self) -> None:
+        while True:
+            *_, future, fn, args, kwargs = self._tasks.get()
+
+            if self._slots is not None:
+                self._slots.release()
+
+            if not future.set_running_or_notify_cancel():  #: cancelled while queued
+                continue
+
+            with self._lock:
+                self.active += 1
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as exc:
+                future.set_exception(exc)
+            finally:
+                with self._lock:
+                    self.active -= 1
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"threads": len(self._threads), "active": self.active, "queued": self._tasks.qsize()}
+
+
+class Scheduler:
+    """
+    :param page_workers: Threads fetching search pages, shared by all searches. Each search still has at most
+    max_in_flight_pages of them in flight.
+    :param detail_workers: Threads fetching extra property data batches.
+    :param max_queued_details: Detail batches waiting for a worker before page workers block on submitting more, so
+    pages aren't fetched faster than they can be enriched.
+    """
+
+    def __init__(self, page_workers: int = 10, detail_workers: int = 20, max_queued_details: int = 100):
+        self.pages = WorkerPool("homeharvest-pages", page_workers)
+        self.details = WorkerPool("homeharvest-details", detail_workers, max_queued=max_queued_details)
+
+    @property
+    def workers(self) -> int:
+        return self.pages.workers + self.details.workers
+
+    def submit_page(self, fn: Callable, *args, priority: int = PRIORITY_DEFAULT, **kwargs) -> Future:
+        """
+        Page tasks may wait on detail tasks, but never on other page tasks
+        """
+        return self.pages.submit(fn, *args, priority=priority, **kwargs)
+
+    def submit_details(self, fn: Callable, *args, **kwargs) -> Future:
+        return self.details.submit(fn, *args, **kwargs)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {"pages": self.pages.stats(), "details": self.details.stats()}
+
+
+#: shared by every search in the process, unless a search is given its own scheduler
+DEFAULT_SCHEDULER = Scheduler()
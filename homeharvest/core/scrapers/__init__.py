@@ -1,12 +1,29 @@
 from __future__ import annotations
 from dataclasses import dataclass
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 import uuid
+import threading
+import time
+import contextvars
+import functools
+from contextlib import nullcontext
 from ...exceptions import AuthenticationError
+from ..cache import ResponseCache, DetailsCache
+from ..state import WatermarkStore, Checkpoint
+from ..scheduler import Scheduler, DEFAULT_SCHEDULER
+from ..transport import Transport, RequestsTransport, DEFAULT_HEADERS
+from ..metrics import MetricsCollector, query_name
+from ..tracing import Profiler, NOOP_TRACER
+from ..cancellation import CancellationToken
+from ..decoder import JSONDecoder, DEFAULT_DECODER
+from ..ratelimit import RateLimiter, Unlimited, DEFAULT_RATE_LIMITER, THROTTLED_STATUS_CODES
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Any
+
+if TYPE_CHECKING:
+    from .realtor.locations import LocationResolver
 from .models import Property, ListingType, SiteName, SearchPropertyType
 import json
+import hashlib
 
 
 @dataclass
@@ -22,55 +39,54 @@ class ScraperInput:
     date_to: str | None = None
     foreclosure: bool | None = False
     extra_property_data: bool | None = True
+    extra_property_data_batch_size: int = 50
     exclude_pending: bool | None = False
+    price_min: int | None = None
+    price_max: int | None = None
+    beds_min: int | None = None
+    beds_max: int | None = None
+    sqft_min: int | None = None
+    sqft_max: int | None = None
+    lot_sqft_min: int | None = None
+    lot_sqft_max: int | None = None
+    property_filter: Callable[[Property], bool] | None = None
+    columns: list[str] | None = None
     limit: int = 10000
+    auto_shard: bool = False
+    max_in_flight_pages: int = 10
+    request_semaphore: threading.Semaphore | None = None
+    cache: ResponseCache | None = None
+    location_resolver: LocationResolver | None = None
+    details_cache: DetailsCache | None = None
+    watermark_store: WatermarkStore | None = None
+    rate_limiter: RateLimiter | None = None
+    scheduler: Scheduler | None = None
+    transport: Transport | None = None
+    http2: bool = False
+    json_decoder: JSONDecoder | None = None
+    metrics: MetricsCollector | None = None
+    tracer: object | None = None  #: an OpenTelemetry Tracer, or anything with the same start_as_current_span
+    profiler: Profiler | None = None
+    cancellation: CancellationToken | None = None
+    checkpoint: Checkpoint | None = None
+    resume: bool = False
+    checkpoint_job: str | None = None  #: journals under this job instead of the search's own query_key
+    shard: bool = False  #: part of a sharded search, whose journal is opened & cleared by the search itself
 
 
 class Scraper:
-    session = None
+    MAX_ATTEMPTS = 4  #: per request, when the host answers 429/403
+    REQUEST_TIMEOUT = 30
 
     def __init__(
         self,
         scraper_input: ScraperInput,
     ):
+        self.scraper_input = scraper_input
         self.location = scraper_input.location
         self.listing_type = scraper_input.listing_type
         self.property_type = scraper_input.property_type
 
-        if not self.session:
-            Scraper.session = requests.Session()
-            retries = Retry(
-                total=3, backoff_factor=4, status_forcelist=[429, 403], allowed_methods=frozenset(["GET", "POST"])
-            )
-
-            adapter = HTTPAdapter(max_retries=retries)
-            Scraper.session.mount("http://", adapter)
-            Scraper.session.mount("https://", adapter)
-            Scraper.session.headers.update(
-                {
-                    "accept": "application/json, text/javascript",
-                    "accept-language": "en-US,en;q=0.9",
-                    "cache-control": "no-cache",
-                    "content-type": "application/json",
-                    "origin": "https://www.realtor.com",
-                    "pragma": "no-cache",
-                    "priority": "u=1, i",
-                    "rdc-ab-tests": "commute_travel_time_variation:v1",
-                    "sec-ch-ua": '"Not)A;Brand";v="99", "Google Chrome";v="127", "Chromium";v="127"',
-                    "sec-ch-ua-mobile": "?0",
-                    "sec-ch-ua-platform": '"Windows"',
-                    "sec-fetch-dest": "empty",
-                    "sec-fetch-mode": "cors",
-                    "sec-fetch-site": "same-origin",
-                    "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36",
-                }
-            )
-
-        if scraper_input.proxy:
-            proxy_url = scraper_input.proxy
-            proxies = {"http": proxy_url, "https": proxy_url}
-            self.session.proxies.update(proxies)
-
         self.listing_type = scraper_input.listing_type
         self.radius = scraper_input.radius
         self.last_x_days = scraper_input.last_x_days
@@ -79,8 +95,178 @@ class Scraper:
         self.date_to = scraper_input.date_to
         self.foreclosure = scraper_input.foreclosure
         self.extra_property_data = scraper_input.extra_property_data
+        self.extra_property_data_batch_size = scraper_input.extra_property_data_batch_size
         self.exclude_pending = scraper_input.exclude_pending
+        self.range_filters = {
+            field: (minimum, maximum)
+            for field, minimum, maximum in [
+                ("list_price", scraper_input.price_min, scraper_input.price_max),
+                ("beds", scraper_input.beds_min, scraper_input.beds_max),
+                ("sqft", scraper_input.sqft_min, scraper_input.sqft_max),
+                ("lot_sqft", scraper_input.lot_sqft_min, scraper_input.lot_sqft_max),
+            ]
+            if minimum is not None or maximum is not None
+        }
+        self.property_filter = scraper_input.property_filter
+        self.columns = scraper_input.columns
         self.limit = scraper_input.limit
+        self.auto_shard = scraper_input.auto_shard
+        self.max_in_flight_pages = scraper_input.max_in_flight_pages
+        self.request_semaphore = scraper_input.request_semaphore
+        self.cache = scraper_input.cache
+        self.details_cache = scraper_input.details_cache
+        self.watermark_store = scraper_input.watermark_store
+        self.rate_limiter = scraper_input.rate_limiter or DEFAULT_RATE_LIMITER
+        self.scheduler = scraper_input.scheduler or DEFAULT_SCHEDULER
+        self.http2 = scraper_input.http2
+        self.json_decoder = scraper_input.json_decoder or DEFAULT_DECODER
+        self.metrics = scraper_input.metrics
+        self.tracer = scraper_input.tracer or NOOP_TRACER
+        self.profiler = scraper_input.profiler
+        self.cancellation = scraper_input.cancellation or CancellationToken()
+        self.checkpoint = scraper_input.checkpoint
+        self.resume = scraper_input.resume or (self.checkpoint is not None and self.checkpoint.resume)
+        self.transport = scraper_input.transport or self.default_transport(scraper_input.proxy)
+
+    def default_transport(self, proxy: str | None) -> Transport:
+        """
+        A transport whose connection pool fits every worker of the scheduler
+        """
+        return RequestsTransport(proxy=proxy, pool_size=self.scheduler.workers)
+
+    def _task(self, fn: Callable) -> Callable:
+        """
+        Prepares a function to run on the scheduler's workers: its spans are children of the span it was scheduled
+        from, and it's profiled along with the rest of the scrape
+        """
+        if self.profiler is not None:
+            fn = self.profiler.wrap(fn)
+
+        if self.tracer is not NOOP_TRACER:
+            fn = functools.partial(contextvars.copy_context().run, fn)
+
+        return fn
+
+    def _completed(self, futures: Iterable[Future]) -> Iterator[tuple[Future, Any]]:
+        """
+        Yields each future & its result as it completes, until the scrape is cancelled. Futures that failed because the
+        scrape was cancelled are left out.
+        """
+        for future in self.cancellation.as_completed(futures):
+            try:
+                result = future.result()
+            except Exception:
+                if self.cancellation.cancelled:
+                    continue
+
+                raise
+
+            yield future, result
+
+    def _host_limiter(self, url: str):
+        return Unlimited() if self.transport.paces_requests else self.rate_limiter.for_url(url)
+
+    def _record_request(self, endpoint: str, query: str, response, started_at: float, retry: bool) -> None:
+        if self.metrics is None:
+            return
+
+        self.metrics.record_request(
+            endpoint,
+            query,
+            status_code=response.status_code if response is not None else None,
+            latency=time.monotonic() - started_at,
+            response_bytes=len(response.content) if response is not None else 0,
+            retry=retry,
+        )
+
+    def _send(self, method: str, url: str, endpoint: str, **kwargs):
+        """
+        Sends a request with the transport once the rate limiter of its host allows it, retrying throttled
+        (429/403) responses. request_semaphore (if any) is held while the request is in flight. Raises ScrapeCancelled
+        instead once the scrape is cancelled, and requests time out by the scrape's deadline.
+        """
+        host_limiter = self._host_limiter(url)
+        query = query_name(kwargs)
+
+        for attempt in range(self.MAX_ATTEMPTS):
+            with self.request_semaphore or nullcontext():
+                self.cancellation.raise_if_cancelled()
+                while (delay := host_limiter.try_acquire()) > 0:
+                    self.cancellation.sleep(delay)
+
+                started_at = time.monotonic()
+                response = status_code = None
+                try:
+                    kwargs["timeout"] = self.cancellation.request_timeout(self.REQUEST_TIMEOUT)
+                    if self.transport.paces_requests:
+                        kwargs["cancellation"] = self.cancellation
+
+                    response = self.transport.request(method, url, **kwargs)
+                    status_code = response.status_code
+                finally:
+                    host_limiter.release(started_at, status_code)
+                    self._record_request(endpoint, query, response, started_at, retry=attempt > 0)
+
+            if status_code not in THROTTLED_STATUS_CODES:
+                break
+
+        return response
+
+    def _request(self, method: str, url: str, endpoint: str, **kwargs) -> dict:
+        """
+        Sends a request & returns the JSON response, decoded from its raw bytes with json_decoder. Responses are served
+        from & stored in the response cache (if any).
+        """
+        cache_key, cached_response = self._cached_response(endpoint, url, kwargs)
+        if cached_response is not None:
+            return cached_response
+
+        response = self._send(method, url, endpoint, **kwargs)
+
+        response_json = self.json_decoder(response.content)
+        self._cache_response(endpoint, cache_key, response.status_code, response_json)
+
+        return response_json
+
+    def _cached_response(self, endpoint: str, url: str, request_kwargs: dict) -> tuple[str | None, dict | None]:
+        if self.cache is None:
+            return None, None
+
+        cache_key = self.cache.key(
+            endpoint, url, payload=request_kwargs.get("json"), params=request_kwargs.get("params")
+        )
+        cached_response = self.cache.get(endpoint, cache_key)
+
+        if cached_response is not None and self.metrics is not None:
+            self.metrics.record_cache_hit(endpoint, query_name(request_kwargs))
+
+        return cache_key, cached_response
+
+    def _cache_response(self, endpoint: str, cache_key: str | None, status_code: int, response_json) -> None:
+        if cache_key and status_code == 200 and isinstance(response_json, dict) and not response_json.get("errors"):
+            self.cache.set(endpoint, cache_key, response_json)
+
+    def query_key(self) -> str:
+        """
+        Identifies a search (its location & filters) across runs, independently of limits & request options. A
+        property_filter isn't part of it.
+        """
+        query = {
+            "location": " ".join(self.location.lower().split()),
+            "listing_type": self.listing_type.value,
+            "property_type": sorted(property_type.value for property_type in self.property_type or []),
+            "radius": self.radius,
+            "mls_only": self.mls_only,
+            "last_x_days": self.last_x_days,
+            "date_from": self.date_from,
+            "date_to": self.date_to,
+            "foreclosure": self.foreclosure,
+            "exclude_pending": self.exclude_pending,
+        }
+        if self.range_filters:  #: only set when used, so the keys of searches without them stay the same
+            query["range_filters"] = self.range_filters
+
+        return hashlib.sha256(json.dumps(query, sort_keys=True).encode()).hexdigest()
 
     def search(self) -> list[Property]: ...
 
@@ -89,11 +275,12 @@ class Scraper:
 
     def handle_location(self): ...
 
-    @staticmethod
-    def get_access_token():
+    @classmethod
+    def get_access_token(cls, transport: Transport | None = None):
         device_id = str(uuid.uuid4()).upper()
 
-        response = requests.post(
+        response = (transport or RequestsTransport()).request(
+            "POST",
             "https://graph.realtor.com/auth/token",
             headers={
                 "Host": "graph.realtor.com",
@@ -112,9 +299,10 @@ class Scraper:
                     "client_app_id": "rdc_mobile_native,24.21.23.679885,iphone",
                 }
             ),
+            timeout=cls.REQUEST_TIMEOUT,
         )
 
-        data = response.json()
+        data = DEFAULT_DECODER(response.content)
 
         if not (access_token := data.get("access_token")):
             raise AuthenticationError(
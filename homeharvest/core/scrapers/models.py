@@ -1,9 +1,31 @@
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from enum import Enum
 from typing import Optional
 
 
+def slotted_dataclass(cls):
+    """
+    dataclass(slots=True), which needs python 3.10: the dataclass is rebuilt with __slots__ instead of a per-instance
+    __dict__, since slots can't coexist with the class attributes holding the field defaults
+    """
+    cls = dataclass(cls)
+
+    inherited_slots = {name for base in cls.__mro__[1:] for name in getattr(base, "__slots__", ())}
+    field_names = [field.name for field in fields(cls)]
+
+    namespace = {
+        name: value
+        for name, value in cls.__dict__.items()
+        if name not in field_names and name not in ("__dict__", "__weakref__")
+    }
+    namespace["__slots__"] = tuple(name for name in field_names if name not in inherited_slots)
+
+    slotted_cls = type(cls)(cls.__name__, cls.__bases__, namespace)
+    slotted_cls.__qualname__ = cls.__qualname__
+    return slotted_cls
+
+
 class SiteName(Enum):
     ZILLOW = "zillow"
     REDFIN = "redfin"
@@ -37,7 +59,7 @@ class ListingType(Enum):
     SOLD = "SOLD"
 
 
-@dataclass
+@slotted_dataclass
 class Agent:
     name: str | None = None
     phone: str | None = None
@@ -67,7 +89,7 @@ class PropertyType(Enum):
     OTHER = "OTHER"
 
 
-@dataclass
+@slotted_dataclass
 class Address:
     full_line: str | None = None
     street: str | None = None
@@ -77,7 +99,7 @@ class Address:
     zip: str | None = None
 
 
-@dataclass
+@slotted_dataclass
 class Description:
     primary_photo: str | None = None
     alt_photos: list[str] | None = None
@@ -94,7 +116,7 @@ class Description:
     text: str | None = None
 
 
-@dataclass
+@slotted_dataclass
 class AgentPhone:  #: For documentation purposes only (at the moment)
     number: str | None = None
     type: str | None = None
@@ -102,13 +124,13 @@ class AgentPhone:  #: For documentation purposes only (at the moment)
     ext: str | None = None
 
 
-@dataclass
+@slotted_dataclass
 class Entity:
     name: str
     uuid: str | None = None
 
 
-@dataclass
+@slotted_dataclass
 class Agent(Entity):
     mls_set: str | None = None
     nrds_id: str | None = None
@@ -117,7 +139,7 @@ class Agent(Entity):
     href: str | None = None
 
 
-@dataclass
+@slotted_dataclass
 class Office(Entity):
     mls_set: str | None = None
     email: str | None = None
@@ -125,17 +147,17 @@ class Office(Entity):
     phones: list[dict] | AgentPhone | None = None
 
 
-@dataclass
+@slotted_dataclass
 class Broker(Entity):
     pass
 
 
-@dataclass
+@slotted_dataclass
 class Builder(Entity):
     pass
 
 
-@dataclass
+@slotted_dataclass
 class Advertisers:
     agent: Agent | None = None
     broker: Broker | None = None
@@ -143,7 +165,7 @@ class Advertisers:
     office: Office | None = None
 
 
-@dataclass
+@slotted_dataclass
 class Property:
     property_url: str
 
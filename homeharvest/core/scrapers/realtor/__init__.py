@@ -8,10 +8,17 @@ This module implements the scraper for realtor.com
 from __future__ import annotations
 
 import json
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from datetime import datetime
+import sys
+import threading
+import warnings
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import replace
+from datetime import datetime, date, timedelta
+from itertools import islice
 from json import JSONDecodeError
-from typing import Dict, Union, Optional
+from typing import Dict, Union, Optional, Iterator, Iterable
+from urllib.parse import urlsplit
 
 from tenacity import (
     retry,
@@ -20,7 +27,9 @@ from tenacity import (
     stop_after_attempt,
 )
 
-from .. import Scraper
+from .. import Scraper, ScraperInput
+from ...scheduler import PRIORITY_FIRST_PAGE, PRIORITY_DEFAULT
+from ...transport import Transport, RequestsTransport, HttpxTransport, RoutingTransport
 from ..models import (
     Property,
     Address,
@@ -32,8 +41,29 @@ from ..models import (
     Builder,
     Advertisers,
     Office,
+    SearchPropertyType,
 )
-from .queries import GENERAL_RESULTS_QUERY, SEARCH_HOMES_DATA, HOMES_DATA
+from .locations import LocationResolver
+from .queries import (
+    GENERAL_RESULTS_QUERY,
+    SEARCH_HOMES_DATA,
+    HOMES_DATA,
+    PROPERTY_DETAILS_DATA,
+    COLUMN_FIELDS,
+    REQUIRED_FIELDS,
+    DETAILS_COLUMNS,
+    ADDRESS_COLUMNS,
+    DESCRIPTION_COLUMNS,
+    ADVERTISER_COLUMNS,
+    general_results_query,
+)
+
+
+def _interned(value: str | None) -> str | None:
+    """
+    Low-cardinality strings (status, mls, city, state, county) are shared by every property holding them
+    """
+    return sys.intern(value) if isinstance(value, str) else value
 
 
 class RealtorScraper(Scraper):
@@ -43,24 +73,91 @@ class RealtorScraper(Scraper):
     ADDRESS_AUTOCOMPLETE_URL = "https://parser-external.geo.moveaws.com/suggest"
     NUM_PROPERTY_WORKERS = 20
     DEFAULT_PAGE_SIZE = 200
+    MAX_RESULTS = 10000  #: home_search can't be paged past this many results
+
+    #: used to split searches without a date filter & searches whose date range can't be split any further
+    SHARD_START_DATE = date(1970, 1, 1)
+    SHARD_PROPERTY_TYPES = [
+        SearchPropertyType.SINGLE_FAMILY,
+        SearchPropertyType.MULTI_FAMILY,
+        SearchPropertyType.CONDO_TOWNHOME_ROWHOME_COOP,
+        SearchPropertyType.DUPLEX_TRIPLEX,
+        SearchPropertyType.FARM,
+        SearchPropertyType.LAND,
+        SearchPropertyType.MOBILE,
+    ]
+
+    location_resolver = LocationResolver()
 
     def __init__(self, scraper_input):
         super().__init__(scraper_input)
 
-    def handle_location(self):
-        params = {
+        if scraper_input.location_resolver is not None:
+            self.location_resolver = scraper_input.location_resolver
+
+        self.watermark = None
+        self._newest: tuple[str, set[str]] | None = None
+        self._property_type_shards: dict[str, int] | None = None
+        self._shards_lock = threading.Lock()
+        if self.watermark_store is not None and (watermark := self.watermark_store.get(self.query_key())):
+            self.watermark = {"date": watermark["date"], "property_ids": set(watermark["property_ids"])}
+
+        self.checkpoint_job = scraper_input.checkpoint_job or self.query_key()
+        if self.checkpoint is not None and not scraper_input.shard and not self.resume:  #: starts a new journal
+            self.checkpoint.clear(self.checkpoint_job)
+
+        #: a property_filter may read any field of the Property, so every field is parsed when one is given
+        self.parsed_columns = self.columns if self.property_filter is None else None
+        self.results_query = (
+            GENERAL_RESULTS_QUERY if self.parsed_columns is None else general_results_query(self._fields())
+        )
+
+    def _fields(self) -> list[str]:
+        """
+        The home_search result fields needed for the parsed columns, the filters & incremental mode
+        """
+        fields = [*REQUIRED_FIELDS, *(field for column in self.parsed_columns for field in COLUMN_FIELDS[column])]
+
+        if self.mls_only:
+            fields.append("source.id")
+
+        if self.watermark_store is not None:
+            fields += ["list_date", "last_sold_date"]
+
+        for field in self.range_filters:
+            fields.append(field if field == "list_price" else f"description.{field}")
+
+        return list(dict.fromkeys(fields))
+
+    def _wants(self, columns: tuple[str, ...]) -> bool:
+        """
+        Whether any of these columns is parsed, i.e. whether the step parsing them is needed
+        """
+        return self.parsed_columns is None or not set(columns).isdisjoint(self.parsed_columns)
+
+    def default_transport(self, proxy: str | None) -> Transport:
+        """
+        In http2 mode, requests to the GraphQL hosts are multiplexed over HTTP/2 connections shared by every search
+        """
+        transport = super().default_transport(proxy)
+        if not self.http2:
+            return transport
+
+        http2_transport = HttpxTransport.shared(http2=True, proxy=proxy, pool_size=self.scheduler.workers)
+        graphql_hosts = {urlsplit(self.SEARCH_GQL_URL).hostname, urlsplit(self.PROPERTY_GQL).hostname}
+
+        return RoutingTransport({host: http2_transport for host in graphql_hosts}, default=transport)
+
+    def _location_params(self) -> dict:
+        return {
             "input": self.location,
             "client_id": self.listing_type.value.lower().replace("_", "-"),
             "limit": "1",
             "area_types": "city,state,county,postal_code,address,street,neighborhood,school,school_district,university,park",
         }
 
-        response = self.session.get(
-            self.ADDRESS_AUTOCOMPLETE_URL,
-            params=params,
-        )
-        response_json = response.json()
-
+    @staticmethod
+    def _parse_location(response_json: dict) -> dict | None:
         result = response_json["autocomplete"]
 
         if not result:
@@ -68,6 +165,24 @@ class RealtorScraper(Scraper):
 
         return result[0]
 
+    def handle_location(self):
+        with self.tracer.start_as_current_span("handle_location", attributes={"location": self.location}) as span:
+            if (location_info := self.location_resolver.resolve(self.location)) is None:
+                response_json = self._request(
+                    "GET",
+                    self.ADDRESS_AUTOCOMPLETE_URL,
+                    endpoint="location",
+                    params=self._location_params(),
+                )
+
+                location_info = self._parse_location(response_json)
+                self.location_resolver.remember(self.location, location_info)
+
+            if location_info:
+                span.set_attribute("area_type", location_info["area_type"])
+
+            return location_info
+
     def get_latest_listing_id(self, property_id: str) -> str | None:
         query = """query Property($property_id: ID!) {
                     property(id: $property_id) {
@@ -85,8 +200,7 @@ class RealtorScraper(Scraper):
             "variables": variables,
         }
 
-        response = self.session.post(self.SEARCH_GQL_URL, json=payload)
-        response_json = response.json()
+        response_json = self._request("POST", self.SEARCH_GQL_URL, endpoint="home", json=payload)
 
         property_info = response_json["data"]["property"]
         if property_info["listings"] is None:
@@ -101,7 +215,8 @@ class RealtorScraper(Scraper):
         else:
             return property_info["listings"][0]["listing_id"]
 
-    def handle_home(self, property_id: str) -> list[Property]:
+    @staticmethod
+    def _home_payload(property_id: str) -> dict:
         query = (
             """query Home($property_id: ID!) {
                     home(property_id: $property_id) %s
@@ -109,19 +224,24 @@ class RealtorScraper(Scraper):
             % HOMES_DATA
         )
 
-        variables = {"property_id": property_id}
-        payload = {
+        return {
             "query": query,
-            "variables": variables,
+            "variables": {"property_id": property_id},
         }
 
-        response = self.session.post(self.SEARCH_GQL_URL, json=payload)
-        response_json = response.json()
-
+    def _parse_home_response(self, response_json: dict) -> list[Property]:
         property_info = response_json["data"]["home"]
 
         return [self.process_property(property_info, "home")]
 
+    def handle_home(self, property_id: str) -> list[Property]:
+        with self.tracer.start_as_current_span("handle_home", attributes={"property_id": property_id}):
+            response_json = self._request(
+                "POST", self.SEARCH_GQL_URL, endpoint="home", json=self._home_payload(property_id)
+            )
+
+            return self._parse_home_response(response_json)
+
     @staticmethod
     def process_advertisers(advertisers: list[dict] | None) -> Advertisers | None:
         if not advertisers:
@@ -169,7 +289,9 @@ class RealtorScraper(Scraper):
         return processed_advertisers
 
     def process_property(self, result: dict, query_name: str) -> Property | None:
-        mls = result["source"].get("id") if "source" in result and isinstance(result["source"], dict) else None
+        mls = (
+            _interned(result["source"].get("id")) if "source" in result and isinstance(result["source"], dict) else None
+        )
 
         if not mls and self.mls_only:
             return
@@ -187,15 +309,21 @@ class RealtorScraper(Scraper):
         if (is_pending or is_contingent) and (self.exclude_pending and self.listing_type != ListingType.PENDING):
             return
 
+        if self.range_filters and not self._in_ranges(result):
+            return
+
         property_id = result["property_id"]
-        prop_details = self.get_prop_details(property_id) if self.extra_property_data and query_name != "home" else {}
-        if not prop_details:
-            prop_details = self.process_extra_property_details(result)
+        prop_details = self.process_extra_property_details(result) if self._wants(DETAILS_COLUMNS) else {}
 
-        property_estimates_root = result.get("current_estimates") or result.get("estimates", {}).get("currentValues")
-        estimated_value = self.get_key(property_estimates_root, [0, "estimate"])
+        estimated_value = None
+        if self._wants(("estimated_value",)):
+            property_estimates_root = result.get("current_estimates") or result.get("estimates", {}).get(
+                "currentValues"
+            )
+            estimated_value = self.get_key(property_estimates_root, [0, "estimate"])
 
-        advertisers = self.process_advertisers(result.get("advertisers"))
+        advertisers = self.process_advertisers(result.get("advertisers")) if self._wants(ADVERTISER_COLUMNS) else None
+        county = (result.get("location") or {}).get("county") or {}
 
         realty_property = Property(
             mls=mls,
@@ -207,23 +335,29 @@ class RealtorScraper(Scraper):
             property_url=result["href"],
             property_id=property_id,
             listing_id=result.get("listing_id"),
-            status=("PENDING" if is_pending else "CONTINGENT" if is_contingent else result["status"].upper()),
-            list_price=result["list_price"],
-            list_price_min=result["list_price_min"],
-            list_price_max=result["list_price_max"],
+            status=(
+                "PENDING" if is_pending else "CONTINGENT" if is_contingent else _interned(result["status"].upper())
+            ),
+            list_price=result.get("list_price"),
+            list_price_min=result.get("list_price_min"),
+            list_price_max=result.get("list_price_max"),
             list_date=(result["list_date"].split("T")[0] if result.get("list_date") else None),
             prc_sqft=result.get("price_per_sqft"),
             last_sold_date=result.get("last_sold_date"),
-            new_construction=result["flags"].get("is_new_construction") is True,
+            new_construction=(
+                result["flags"].get("is_new_construction") is True if self._wants(("new_construction",)) else None
+            ),
             hoa_fee=(result["hoa"]["fee"] if result.get("hoa") and isinstance(result["hoa"], dict) else None),
             latitude=(result["location"]["address"]["coordinate"].get("lat") if able_to_get_lat_long else None),
             longitude=(result["location"]["address"]["coordinate"].get("lon") if able_to_get_lat_long else None),
-            address=self._parse_address(result, search_type="general_search"),
-            description=self._parse_description(result),
-            neighborhoods=self._parse_neighborhoods(result),
-            county=(result["location"]["county"].get("name") if result["location"]["county"] else None),
-            fips_code=(result["location"]["county"].get("fips_code") if result["location"]["county"] else None),
-            days_on_mls=self.calculate_days_on_mls(result),
+            address=(
+                self._parse_address(result, search_type="general_search") if self._wants(ADDRESS_COLUMNS) else None
+            ),
+            description=self._parse_description(result) if self._wants(DESCRIPTION_COLUMNS) else None,
+            neighborhoods=self._parse_neighborhoods(result) if self._wants(("neighborhoods",)) else None,
+            county=_interned(county.get("name")),
+            fips_code=county.get("fips_code"),
+            days_on_mls=self.calculate_days_on_mls(result) if self._wants(("days_on_mls",)) else None,
             nearby_schools=prop_details.get("schools"),
             assessed_value=prop_details.get("assessed_value"),
             estimated_value=estimated_value if estimated_value else None,
@@ -233,11 +367,38 @@ class RealtorScraper(Scraper):
         )
         return realty_property
 
-    def general_search(self, variables: dict, search_type: str) -> Dict[str, Union[int, list[Property]]]:
+    def _in_ranges(self, result: dict) -> bool:
         """
-        Handles a location area & returns a list of properties
+        Client-side check of the range filters, for results the server didn't filter (properties without a value for a
+        filtered field are excluded)
         """
+        description = result.get("description") or {}
+
+        for field, (minimum, maximum) in self.range_filters.items():
+            value = result.get(field) if field == "list_price" else description.get(field)
+
+            if value is None or (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+                return False
 
+        return True
+
+    def _filters_param(self) -> str:
+        """
+        The home_search filters for the price, beds, sqft & lot size ranges, and for exclude_pending
+        """
+        filters = []
+        for field, bounds in self.range_filters.items():
+            bounds = ", ".join(
+                f"{bound}: {json.dumps(value)}" for bound, value in zip(("min", "max"), bounds) if value is not None
+            )
+            filters.append(f"{field}: {{ {bounds} }}")
+
+        if self.exclude_pending and self.listing_type == ListingType.FOR_SALE:
+            filters += ["pending: false", "contingent: false"]
+
+        return "\n".join(filters)
+
+    def _search_query(self, variables: dict, search_type: str) -> str:
         date_param = ""
         if self.listing_type == ListingType.SOLD:
             if self.date_from and self.date_to:
@@ -265,6 +426,8 @@ class RealtorScraper(Scraper):
             "or_filters: { contingent: true, pending: true }" if self.listing_type == ListingType.PENDING else ""
         )
 
+        filters_param = self._filters_param()
+
         listing_type = ListingType.FOR_SALE if self.listing_type == ListingType.PENDING else self.listing_type
         is_foreclosure = ""
 
@@ -290,6 +453,7 @@ class RealtorScraper(Scraper):
                                 %s
                                 %s
                                 %s
+                                %s
                             }
                             %s
                             limit: 200
@@ -301,8 +465,9 @@ class RealtorScraper(Scraper):
                 date_param,
                 property_type_param,
                 pending_or_contingent_param,
+                filters_param,
                 sort_param,
-                GENERAL_RESULTS_QUERY,
+                self.results_query,
             )
         elif search_type == "area":  #: general search, came from a general location
             query = """query Home_search(
@@ -323,6 +488,7 @@ class RealtorScraper(Scraper):
                                         %s
                                         %s
                                         %s
+                                        %s
                                     }
                                     %s
                                     limit: 200
@@ -334,8 +500,9 @@ class RealtorScraper(Scraper):
                 date_param,
                 property_type_param,
                 pending_or_contingent_param,
+                filters_param,
                 sort_param,
-                GENERAL_RESULTS_QUERY,
+                self.results_query,
             )
         else:  #: general search, came from an address
             query = (
@@ -351,18 +518,15 @@ class RealtorScraper(Scraper):
                             offset: $offset
                         ) %s
                     }"""
-                % GENERAL_RESULTS_QUERY
+                % self.results_query
             )
 
-        payload = {
-            "query": query,
-            "variables": variables,
-        }
-
-        response = self.session.post(self.SEARCH_GQL_URL, json=payload)
-        response_json = response.json()
-        search_key = "home_search" if "home_search" in query else "property_search"
+        return query
 
+    def _parse_search_response(self, response_json: dict, search_key: str, offset: int) -> dict:
+        """
+        Parses a home_search page into properties, without fetching any extra property data
+        """
         properties: list[Property] = []
 
         if (
@@ -373,34 +537,174 @@ class RealtorScraper(Scraper):
             or response_json["data"][search_key] is None
             or "results" not in response_json["data"][search_key]
         ):
-            return {"total": 0, "properties": []}
+            return {"total": 0, "properties": [], "reached_watermark": False}
 
         properties_list = response_json["data"][search_key]["results"]
         total_properties = response_json["data"][search_key]["total"]
-        offset = variables.get("offset", 0)
 
         #: limit the number of properties to be processed
         #: example, if your offset is 200, and your limit is 250, return 50
         properties_list = properties_list[: self.limit - offset]
 
-        with ThreadPoolExecutor(max_workers=self.NUM_PROPERTY_WORKERS) as executor:
-            futures = [executor.submit(self.process_property, result, search_key) for result in properties_list]
+        reached_watermark = False
+        for result in properties_list:
+            if self.watermark_store is not None:
+                self._track_newest(result)
+
+                if not self._is_after_watermark(result):
+                    reached_watermark = reached_watermark or self._is_before_watermark(result)
+                    continue
 
-            for future in as_completed(futures):
-                result = future.result()
-                if result:
-                    properties.append(result)
+            with self.tracer.start_as_current_span(
+                "process_property", attributes={"property_id": result["property_id"]}
+            ):
+                processed_property = self.process_property(result, search_key)
+
+            if processed_property and (self.property_filter is None or self.property_filter(processed_property)):
+                properties.append(processed_property)
 
         return {
             "total": total_properties,
             "properties": properties,
+            "reached_watermark": reached_watermark,
         }
 
-    def search(self):
-        location_info = self.handle_location()
-        if not location_info:
-            return []
+    def _watermark_date(self, result: dict) -> str | None:
+        #: home_search is sorted by sold_date for sold listings, list_date otherwise
+        return (
+            result.get("last_sold_date") if self.listing_type == ListingType.SOLD else result.get("list_date")
+        ) or None
+
+    def _is_after_watermark(self, result: dict) -> bool:
+        """
+        Listings without a date can't be placed relative to the watermark, so they're only returned by the first run
+        """
+        if not self.watermark:
+            return True
+
+        if (date := self._watermark_date(result)) is None:
+            return False
+
+        return date > self.watermark["date"] or (
+            date == self.watermark["date"] and result["property_id"] not in self.watermark["property_ids"]
+        )
+
+    def _is_before_watermark(self, result: dict) -> bool:
+        date = self._watermark_date(result)
+
+        return bool(self.watermark) and (date is None or date < self.watermark["date"])
+
+    def _track_newest(self, result: dict) -> None:
+        if (date := self._watermark_date(result)) is None:
+            return
+
+        if self._newest is None or date > self._newest[0]:
+            self._newest = (date, {result["property_id"]})
+        elif date == self._newest[0]:
+            self._newest[1].add(result["property_id"])
+
+    def _save_watermark(self, result: dict) -> None:
+        """
+        Moves the watermark to the newest listing seen, once the pages down to the previous watermark (or the last
+        page) have been fetched. A run cut short by the limit before the previous watermark leaves it as it is, since
+        the listings between its last page and the previous watermark weren't seen.
+        """
+        if self._newest is None:
+            return
+
+        if self.watermark and not result["reached_watermark"] and result["total"] > self.limit:
+            warnings.warn(
+                f"{self.location} has more new listings than the limit of {self.limit}, the watermark isn't moved"
+            )
+            return
+
+        date, property_ids = self._newest
+        if self.watermark and date < self.watermark["date"]:
+            return
+
+        if self.watermark and date == self.watermark["date"]:
+            property_ids = property_ids | self.watermark["property_ids"]
+
+        self.watermark_store.set(self.query_key(), date, list(property_ids))
 
+    def _iter_incremental_pages(
+        self, search_type: str, search_variables: dict, result: dict
+    ) -> Iterator[list[Property]]:
+        """
+        Fetches the pages after the first one in order, stopping at the first page that reaches the watermark
+        """
+        for offset in self._page_offsets(result["total"]):
+            if result["reached_watermark"]:
+                break
+
+            result = self.general_search(search_variables | {"offset": offset}, search_type=search_type)
+            yield self._page_properties(result)
+
+        self._save_watermark(result)
+
+    def general_search(self, variables: dict, search_type: str) -> Dict[str, Union[int, list[Property]]]:
+        """
+        Handles a location area & returns a list of properties
+        """
+        offset = variables.get("offset", 0)
+
+        with self.tracer.start_as_current_span(
+            "general_search", attributes={"search_type": search_type, "offset": offset}
+        ) as span:
+            query = self._search_query(variables, search_type)
+            if (response_json := self._checkpointed_page(offset)) is None:
+                response_json = self._request(
+                    "POST", self.SEARCH_GQL_URL, endpoint="search", json={"query": query, "variables": variables}
+                )
+            search_key = "home_search" if "home_search" in query else "property_search"
+
+            result = self._parse_search_response(response_json, search_key, offset)
+            span.set_attributes({"total": result["total"], "results": len(result["properties"])})
+
+            if self.extra_property_data:  #: served from the journal too, for the properties of a resumed page
+                result["skipped_details"] = self.enrich_properties(result["properties"])
+
+            self._checkpoint_page(offset, response_json)
+            return result
+
+    def _page_properties(self, result: dict) -> list[Property]:
+        """
+        The properties of a page returned by the search. Only then are those left without their extra property data
+        (if the scrape was cancelled while the page was enriched) counted as skipped, since the details of a page
+        that's dropped are already part of its skipped page.
+        """
+        if result.get("skipped_details"):
+            self.cancellation.skip(details=result["skipped_details"])
+
+        return result["properties"]
+
+    def _page_key(self, offset: int) -> str:
+        page_key = f"{self.query_key()}:{self.limit}:{offset}:{int(self.extra_property_data)}"
+
+        return page_key if self.parsed_columns is None else f"{page_key}:{','.join(sorted(self.parsed_columns))}"
+
+    def _checkpointed_page(self, offset: int) -> dict | None:
+        """
+        The search response journaled for the page, which is parsed (& enriched) again instead of being fetched
+        """
+        if self.checkpoint is None or not self.resume:
+            return None
+
+        return self.checkpoint.get_page(self.checkpoint_job, self._page_key(offset))
+
+    def _checkpoint_page(self, offset: int, response_json: dict) -> None:
+        """
+        Journals a page's search response once the page has been fetched & enriched, unless the scrape was cancelled
+        halfway through it
+        """
+        if self.checkpoint is not None and not self.cancellation.cancelled:
+            self.checkpoint.set_page(self.checkpoint_job, self._page_key(offset), response_json)
+
+    def _search_variables(self, location_info: dict) -> tuple[str, dict] | None:
+        """
+        Builds the search type & variables for a resolved location. Single addresses (no radius) return the
+        "address" search type with the property_id to fetch, and comps searches without a centroid return None.
+        """
         location_type = location_info["area_type"]
 
         search_variables = {
@@ -414,12 +718,11 @@ class RealtorScraper(Scraper):
         )
         if location_type == "address":
             if not self.radius:  #: single address search, non comps
-                property_id = location_info["mpr_id"]
-                return self.handle_home(property_id)
+                return search_type, {"property_id": location_info["mpr_id"]}
 
             else:  #: general search, comps (radius)
                 if not location_info.get("centroid"):
-                    return []
+                    return None
 
                 coordinates = list(location_info["centroid"].values())
                 search_variables |= {
@@ -443,28 +746,240 @@ class RealtorScraper(Scraper):
         if self.foreclosure:
             search_variables["foreclosure"] = self.foreclosure
 
-        result = self.general_search(search_variables, search_type=search_type)
-        total = result["total"]
-        homes = result["properties"]
+        return search_type, search_variables
 
-        with ThreadPoolExecutor() as executor:
-            futures = [
-                executor.submit(
-                    self.general_search,
-                    variables=search_variables | {"offset": i},
-                    search_type=search_type,
-                )
-                for i in range(
-                    self.DEFAULT_PAGE_SIZE,
-                    min(total, self.limit),
-                    self.DEFAULT_PAGE_SIZE,
-                )
+    def _page_offsets(self, total: int) -> range:
+        return range(
+            self.DEFAULT_PAGE_SIZE,
+            min(total, self.limit, self.MAX_RESULTS),
+            self.DEFAULT_PAGE_SIZE,
+        )
+
+    def _date_window(self) -> tuple[date, date]:
+        tomorrow = date.today() + timedelta(days=1)
+
+        if self.date_from and self.date_to:
+            return date.fromisoformat(self.date_from), date.fromisoformat(self.date_to)
+        elif self.last_x_days:
+            return tomorrow - timedelta(days=self.last_x_days + 1), tomorrow
+
+        return self.SHARD_START_DATE, tomorrow
+
+    def _plan_shards(self, total: int) -> list[ScraperInput]:
+        """
+        Splits a search with more results than can be paged into narrower searches: the two halves of its date range
+        (list_date, or sold_date for sold listings), then one search per property type. Returns no shards if the
+        search fits, isn't sharded or can't be split any further.
+        """
+        if not self.auto_shard or total <= self.MAX_RESULTS:
+            return []
+
+        if self.limit <= self.MAX_RESULTS:
+            warnings.warn(
+                f"{self.location} has {total} results, but auto_shard only fetches more than {self.MAX_RESULTS} of them "
+                f"when the limit is above {self.MAX_RESULTS}"
+            )
+            return []
+
+        start, end = self._date_window()
+        shard_input = replace(
+            self.scraper_input,
+            date_from=str(start),
+            date_to=str(end),
+            last_x_days=None,
+            watermark_store=None,
+            checkpoint_job=self.checkpoint_job,
+            shard=True,
+        )
+
+        if (end - start).days > 1:
+            middle = start + timedelta(days=(end - start).days // 2)
+
+            #: both halves include the middle day, in case the max date is exclusive
+            return [
+                replace(shard_input, date_to=str(middle)),
+                replace(shard_input, date_from=str(middle)),
             ]
 
-            for future in as_completed(futures):
-                homes.extend(future.result()["properties"])
+        if not self.property_type:
+            self._property_type_shards = {"pending": len(self.SHARD_PROPERTY_TYPES), "total": 0, "expected": total}
+            return [replace(shard_input, property_type=[property_type]) for property_type in self.SHARD_PROPERTY_TYPES]
+
+        warnings.warn(
+            f"{self.location} has {total} results between {start} and {end}, "
+            f"only the first {self.MAX_RESULTS} are returned"
+        )
+        return []
+
+    def _count_shard_total(self, total: int) -> None:
+        """
+        Adds up the totals of the property type shards planned by this search, as their first pages come in, and warns
+        if they don't add up to the search's total: listings of other property types can't be fetched by sharding
+        """
+        if self._property_type_shards is None:  #: date range shards cover the whole search
+            return
+
+        with self._shards_lock:
+            shards = self._property_type_shards
+            shards["pending"] -= 1
+            shards["total"] += total
+
+            if shards["pending"] or shards["total"] >= shards["expected"]:
+                return
+
+        start, end = self._date_window()
+        warnings.warn(
+            f"{self.location} has {shards['expected'] - shards['total']} results between {start} and {end} of other "
+            f"property types, which can't be sharded and aren't returned"
+        )
+
+    def _dedupe_pages(self, pages: Iterable[list[Property]], seen: set[str]) -> Iterator[list[Property]]:
+        """
+        Drops the properties already seen from each page, and stops once the limit is reached
+        """
+        for page in pages:
+            unseen = {}
+            for realty_property in page:
+                if realty_property and realty_property.property_id not in seen:
+                    unseen.setdefault(realty_property.property_id, realty_property)
+
+            page = list(islice(unseen.values(), self.limit - len(seen)))
+            seen.update(unseen)
+            yield page
+
+            if len(seen) >= self.limit:
+                return
+
+    def _search_plan(self) -> tuple[str, dict] | None:
+        location_info = self.handle_location()
+        if not location_info:
+            return None
+
+        return self._search_variables(location_info)
+
+    def _fetch_shard(self, shard_input: ScraperInput) -> tuple[RealtorScraper, str, dict, dict] | None:
+        """
+        Resolves the search of a shard & fetches its first page
+        """
+        attributes = {"date_from": shard_input.date_from, "date_to": shard_input.date_to}
+        if shard_input.property_type:
+            attributes["property_type"] = ",".join(property_type.value for property_type in shard_input.property_type)
+
+        with self.tracer.start_as_current_span("fetch_shard", attributes=attributes):
+            shard = RealtorScraper(shard_input)
+            if not (search_plan := shard._search_plan()):
+                self._count_shard_total(0)
+                return None
+
+            search_type, search_variables = search_plan
+            result = shard.general_search(search_variables, search_type=search_type)
+            self._count_shard_total(result["total"])
+
+            return shard, search_type, search_variables, result
+
+    def _follow_up_tasks(self, search_type: str, search_variables: dict, result: dict) -> list[tuple]:
+        """
+        The (is_shard, function, args) tasks fetching the rest of a search after its first page: one per shard if it
+        has too many results to page through, one per remaining page otherwise
+        """
+        if shard_inputs := self._plan_shards(result["total"]):
+            return [(True, self._fetch_shard, (shard_input,)) for shard_input in shard_inputs]
+
+        return [
+            (False, self.general_search, (search_variables | {"offset": offset}, search_type))
+            for offset in self._page_offsets(result["total"])
+        ]
+
+    def _iter_follow_up_pages(self, search_type: str, search_variables: dict, result: dict) -> Iterator[list[Property]]:
+        """
+        Fetches the rest of a search on the scheduler's page workers, at most max_in_flight_pages at a time, and
+        yields each page as soon as it has been fetched & enriched. The first page of each shard is prioritized, since
+        the rest of the shard depends on it.
+        """
+        tasks = deque(self._follow_up_tasks(search_type, search_variables, result))
+        in_flight: dict[Future, bool] = {}
+
+        try:
+            while (tasks or in_flight) and not self.cancellation.cancelled:
+                while tasks and len(in_flight) < self.max_in_flight_pages:
+                    is_shard, fn, args = tasks.popleft()
+                    priority = PRIORITY_FIRST_PAGE if is_shard else PRIORITY_DEFAULT
+                    in_flight[self.scheduler.submit_page(self._task(fn), *args, priority=priority)] = is_shard
+
+                for future in self.cancellation.wait(in_flight):
+                    is_shard = in_flight.pop(future)
+                    try:
+                        fetched = future.result()
+                    except Exception:
+                        if not self.cancellation.cancelled:
+                            raise
+
+                        self.cancellation.skip(pages=not is_shard, shards=is_shard)
+                        continue
+
+                    if not is_shard:
+                        yield self._page_properties(fetched)
+                    elif fetched:
+                        shard, shard_search_type, shard_search_variables, shard_result = fetched
+                        yield self._page_properties(shard_result)
+                        tasks.extend(shard._follow_up_tasks(shard_search_type, shard_search_variables, shard_result))
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+            if self.cancellation.cancelled:
+                skipped_shards = sum(in_flight.values()) + sum(is_shard for is_shard, *_ in tasks)
+                self.cancellation.skip(pages=len(in_flight) + len(tasks) - skipped_shards, shards=skipped_shards)
+
+    def iter_pages(self) -> Iterator[list[Property]]:
+        """
+        Yields the properties of each search page as soon as it has been fetched & enriched. At most
+        max_in_flight_pages pages are fetched ahead of the consumer. Once the scrape is cancelled, no more pages are
+        fetched and the pages skipped are counted on the cancellation token.
+        """
+        try:
+            yield from self._iter_pages()
+        except Exception:
+            if not self.cancellation.cancelled:
+                raise
+
+            self.cancellation.skip(pages=1)
+            return
+
+        self._clear_checkpoint()
+
+    def _clear_checkpoint(self) -> None:
+        """
+        Clears the journal of the search once it has completed, unless it was cancelled (or is a shard of a search)
+        """
+        if self.checkpoint is not None and not self.scraper_input.shard and not self.cancellation.cancelled:
+            self.checkpoint.clear(self.checkpoint_job)
+
+    def _iter_pages(self) -> Iterator[list[Property]]:
+        if not (search_plan := self._search_plan()):
+            return
+
+        search_type, search_variables = search_plan
+        if search_type == "address":
+            yield self.handle_home(search_variables["property_id"])
+            return
+
+        result = self.cancellation.result(
+            self.scheduler.submit_page(
+                self._task(self.general_search), search_variables, search_type=search_type, priority=PRIORITY_FIRST_PAGE
+            )
+        )
+        yield self._page_properties(result)
+
+        if self.watermark_store is not None:
+            yield from self._iter_incremental_pages(search_type, search_variables, result)
+            return
 
-        return homes
+        seen = {realty_property.property_id for realty_property in result["properties"]}
+        yield from self._dedupe_pages(self._iter_follow_up_pages(search_type, search_variables, result), seen)
+
+    def search(self):
+        return [realty_property for page in self.iter_pages() for realty_property in page]
 
     @staticmethod
     def get_key(data: dict, keys: list):
@@ -515,6 +1030,148 @@ class RealtorScraper(Scraper):
             "tax_history": processed_tax_history,
         }
 
+    @staticmethod
+    def _details_payload(property_id: str) -> dict:
+        query = (
+            """query GetHome($property_id: ID!) {
+                    home(property_id: $property_id) {
+                        __typename
+                        %s
+                    }
+                }"""
+            % PROPERTY_DETAILS_DATA
+        )
+
+        return {"query": query, "variables": {"property_id": property_id}}
+
+    def _apply_details(self, properties: list[Property], prop_details: dict[str, dict]) -> None:
+        for realty_property in properties:
+            if details := prop_details.get(realty_property.property_id):
+                self.apply_prop_details(realty_property, details)
+
+    def _cached_details(self, properties: list[Property]) -> dict[str, dict]:
+        property_ids = list({realty_property.property_id for realty_property in properties})
+        cached_details = self.details_cache.get_many(property_ids) if self.details_cache is not None else {}
+
+        if self.checkpoint is not None and self.resume:
+            cached_details |= self.checkpoint.get_details(
+                self.checkpoint_job, [property_id for property_id in property_ids if property_id not in cached_details]
+            )
+
+        return cached_details
+
+    def _checkpoint_details(self, prop_details: dict[str, dict]) -> None:
+        if self.checkpoint is not None:
+            self.checkpoint.set_details(self.checkpoint_job, prop_details)
+
+    def _store_details(self, prop_details: dict[str, dict]) -> None:
+        if self.details_cache is not None:
+            self.details_cache.set_many(prop_details)
+
+    def _details_batches(self, properties: list[Property], cached_details: dict[str, dict]) -> list[list[str]]:
+        property_ids = [
+            property_id
+            for property_id in dict.fromkeys(realty_property.property_id for realty_property in properties)
+            if property_id not in cached_details
+        ]
+
+        return [
+            property_ids[i : i + self.extra_property_data_batch_size]
+            for i in range(0, len(property_ids), self.extra_property_data_batch_size)
+        ]
+
+    @staticmethod
+    def apply_prop_details(realty_property: Property, prop_details: dict) -> None:
+        realty_property.nearby_schools = prop_details.get("schools")
+        realty_property.assessed_value = prop_details.get("assessed_value")
+        realty_property.tax = prop_details.get("tax")
+        realty_property.tax_history = prop_details.get("tax_history")
+
+    def enrich_properties(self, properties: list[Property]) -> int:
+        """
+        Fetches the extra property details for every property in batches of
+        extra_property_data_batch_size, one GraphQL request per batch. Properties found in the details cache (if any)
+        are not fetched again. If the scrape is cancelled, the properties whose batch hadn't finished are left as is,
+        and their number is returned (for the caller to count as skipped).
+        """
+        with self.tracer.start_as_current_span("enrich_properties", attributes={"properties": len(properties)}) as span:
+            cached_details = self._cached_details(properties)
+            span.set_attribute("cached", len(cached_details))
+
+            fetched_details = {}
+            batches = {
+                self.scheduler.submit_details(self._task(self.get_prop_details_batch), batch): batch
+                for batch in self._details_batches(properties, cached_details)
+            }
+
+            for _, batch_details in self._completed(batches):
+                fetched_details.update(batch_details)
+                self._checkpoint_details(batch_details)
+
+            self._store_details(fetched_details)
+            self._apply_details(properties, cached_details | fetched_details)
+
+            return sum(map(len, batches.values())) - len(fetched_details) if self.cancellation.cancelled else 0
+
+    @retry(
+        retry=retry_if_exception_type(JSONDecodeError),
+        wait=wait_exponential(min=4, max=10),
+        stop=stop_after_attempt(3),
+    )
+    def get_prop_details_batch(self, property_ids: list[str]) -> dict[str, dict]:
+        """
+        Fetches the extra property details of many properties in a single request, using one aliased home field
+        per property. Properties whose alias errored or came back empty are retried individually.
+        """
+        if not self.extra_property_data or not property_ids:
+            return {}
+
+        with self.tracer.start_as_current_span(
+            "get_prop_details_batch", attributes={"properties": len(property_ids)}
+        ) as span:
+            aliases = {f"home_{i}": property_id for i, property_id in enumerate(property_ids)}
+            response_json = self._request(
+                "POST", self.SEARCH_GQL_URL, endpoint="details", json=self._details_batch_payload(aliases)
+            )
+
+            prop_details, failed_property_ids = self._parse_details_batch(response_json, aliases)
+            span.set_attribute("failed", len(failed_property_ids))
+
+            for property_id in failed_property_ids:
+                prop_details[property_id] = self.get_prop_details(property_id)
+
+            return prop_details
+
+    @staticmethod
+    def _details_batch_payload(aliases: dict[str, str]) -> dict:
+        query = "query GetHomes(%s) {\n%s\n}" % (
+            ", ".join(f"${alias}: ID!" for alias in aliases),
+            "\n".join(
+                "%s: home(property_id: $%s) { __typename %s }" % (alias, alias, PROPERTY_DETAILS_DATA)
+                for alias in aliases
+            ),
+        )
+
+        return {"query": query, "variables": aliases}
+
+    def _parse_details_batch(self, data: dict, aliases: dict[str, str]) -> tuple[dict[str, dict], list[str]]:
+        """
+        Returns the processed details per property_id, and the property_ids whose alias errored or came back empty
+        """
+        homes = data.get("data") or {}
+        failed_aliases = {
+            error["path"][0] for error in data.get("errors") or [] if error.get("path") and error["path"][0] in aliases
+        }
+
+        prop_details, failed_property_ids = {}, []
+        for alias, property_id in aliases.items():
+            if alias in failed_aliases or not homes.get(alias):
+                failed_property_ids.append(property_id)
+            else:
+                prop_details[property_id] = self.process_extra_property_details(homes[alias])
+
+        return prop_details, failed_property_ids
+
     @retry(
         retry=retry_if_exception_type(JSONDecodeError),
         wait=wait_exponential(min=4, max=10),
@@ -524,24 +1181,16 @@ class RealtorScraper(Scraper):
         if not self.extra_property_data:
             return {}
 
-        query = """query GetHome($property_id: ID!) {
-                    home(property_id: $property_id) {
-                        __typename
-
-                        nearbySchools: nearby_schools(radius: 5.0, limit_per_level: 3) {
-                            __typename schools { district { __typename id name } }
-                        }
-                        taxHistory: tax_history { __typename tax year assessment { __typename building land total } }
-                    }
-                }"""
-
-        variables = {"property_id": property_id}
-        response = self.session.post(self.SEARCH_GQL_URL, json={"query": query, "variables": variables})
+        with self.tracer.start_as_current_span("get_prop_details", attributes={"property_id": property_id}):
+            response_json = self._request(
+                "POST", self.SEARCH_GQL_URL, endpoint="details", json=self._details_payload(property_id)
+            )
 
-        data = response.json()
-        property_details = data["data"]["home"]
+            property_details = self.get_key(response_json, ["data", "home"])
+            if not property_details:
+                return {}
 
-        return self.process_extra_property_details(property_details)
+            return self.process_extra_property_details(property_details)
 
     @staticmethod
     def _parse_neighborhoods(result: dict) -> Optional[str]:
@@ -582,10 +1231,10 @@ class RealtorScraper(Scraper):
                 ]
                 if part is not None
             ).strip(),
-            unit=address["unit"],
-            city=address["city"],
-            state=address["state_code"],
-            zip=address["postal_code"],
+            unit=address.get("unit"),
+            city=_interned(address.get("city")),
+            state=_interned(address.get("state_code")),
+            zip=address.get("postal_code"),
         )
 
     @staticmethod
@@ -619,7 +1268,7 @@ class RealtorScraper(Scraper):
             lot_sqft=description_data.get("lot_sqft"),
             sold_price=(
                 result.get("last_sold_price") or description_data.get("sold_price")
-                if result.get("last_sold_date") or result["list_price"] != description_data.get("sold_price")
+                if result.get("last_sold_date") or result.get("list_price") != description_data.get("sold_price")
                 else None
             ),  #: has a sold date or list and sold price are different
             year_built=description_data.get("year_built"),
@@ -0,0 +1,321 @@
+"""
+homeharvest.realtor.aio
+~~~~~~~~~~~~
+
+This module implements an asyncio counterpart of the realtor.com scraper. Query building & parsing are shared with
+RealtorScraper; only the network calls are coroutines, all bounded by a single semaphore.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from json import JSONDecodeError
+
+from tenacity import (
+    retry,
+    retry_if_exception_type,
+    wait_exponential,
+    stop_after_attempt,
+)
+
+from .. import DEFAULT_HEADERS
+from ...metrics import query_name
+from ...ratelimit import THROTTLED_STATUS_CODES
+from ..models import Property
+from . import RealtorScraper
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+
+class AsyncRealtorScraper(RealtorScraper):
+    REQUEST_TIMEOUT = 30
+
+    def __init__(self, scraper_input, client: "httpx.AsyncClient | None" = None):
+        if httpx is None:
+            raise ImportError("The async scraper requires httpx, install it with: pip install homeharvest[async]")
+
+        if scraper_input.transport is not None:
+            raise ValueError("The async scraper sends requests with its own httpx client, transports aren't supported")
+
+        super().__init__(scraper_input)
+
+        self.proxy = scraper_input.proxy
+        self.client = client
+        self.semaphore: asyncio.Semaphore | None = None
+        self.total = 0  #: of the search's first page, which a shard reports to the search that planned it
+
+    def default_transport(self, proxy: str | None) -> None:
+        """
+        Requests are sent with the scraper's httpx client instead
+        """
+        return None
+
+    def _host_limiter(self, url: str):
+        return self.rate_limiter.for_url(url)
+
+    async def _send(self, method: str, url: str, endpoint: str, **kwargs) -> "httpx.Response":
+        host_limiter = self._host_limiter(url)
+        query = query_name(kwargs)
+
+        for attempt in range(self.MAX_ATTEMPTS):
+            async with self.semaphore:
+                self.cancellation.raise_if_cancelled()
+                while (delay := host_limiter.try_acquire()) > 0:
+                    await asyncio.sleep(min(delay, self.cancellation.POLL_INTERVAL))
+                    self.cancellation.raise_if_cancelled()
+
+                started_at = time.monotonic()
+                response = status_code = None
+                try:
+                    kwargs["timeout"] = self.cancellation.request_timeout(self.REQUEST_TIMEOUT)
+                    response = await self.client.request(method, url, **kwargs)
+                    status_code = response.status_code
+                finally:
+                    host_limiter.release(started_at, status_code)
+                    self._record_request(endpoint, query, response, started_at, retry=attempt > 0)
+
+            if status_code not in THROTTLED_STATUS_CODES:
+                break
+
+        return response
+
+    async def _request(self, method: str, url: str, endpoint: str, **kwargs) -> dict:
+        """
+        Like Scraper._request. The response cache, the checkpoint, the details cache & the watermark store are backed
+        by SQLite, so they're read & written on a thread instead of blocking the event loop.
+        """
+        if self.cache is None:
+            cache_key = None
+        else:
+            cache_key, cached_response = await asyncio.to_thread(self._cached_response, endpoint, url, kwargs)
+            if cached_response is not None:
+                return cached_response
+
+        response = await self._send(method, url, endpoint, **kwargs)
+
+        response_json = self.json_decoder(response.content)
+        if cache_key is not None:
+            await asyncio.to_thread(self._cache_response, endpoint, cache_key, response.status_code, response_json)
+
+        return response_json
+
+    async def handle_location(self):
+        with self.tracer.start_as_current_span("handle_location", attributes={"location": self.location}) as span:
+            if (location_info := self.location_resolver.resolve(self.location)) is None:
+                response_json = await self._request(
+                    "GET", self.ADDRESS_AUTOCOMPLETE_URL, endpoint="location", params=self._location_params()
+                )
+
+                location_info = self._parse_location(response_json)
+                self.location_resolver.remember(self.location, location_info)
+
+            if location_info:
+                span.set_attribute("area_type", location_info["area_type"])
+
+            return location_info
+
+    async def handle_home(self, property_id: str) -> list[Property]:
+        with self.tracer.start_as_current_span("handle_home", attributes={"property_id": property_id}):
+            response_json = await self._request(
+                "POST", self.SEARCH_GQL_URL, endpoint="home", json=self._home_payload(property_id)
+            )
+
+            return self._parse_home_response(response_json)
+
+    async def general_search(self, variables: dict, search_type: str) -> dict:
+        offset = variables.get("offset", 0)
+
+        with self.tracer.start_as_current_span(
+            "general_search", attributes={"search_type": search_type, "offset": offset}
+        ) as span:
+            query = self._search_query(variables, search_type)
+            if (response_json := await asyncio.to_thread(self._checkpointed_page, offset)) is None:
+                response_json = await self._request(
+                    "POST", self.SEARCH_GQL_URL, endpoint="search", json={"query": query, "variables": variables}
+                )
+            search_key = "home_search" if "home_search" in query else "property_search"
+
+            result = self._parse_search_response(response_json, search_key, offset)
+            span.set_attributes({"total": result["total"], "results": len(result["properties"])})
+
+            if self.extra_property_data:
+                await self.enrich_properties(result["properties"])
+
+            await asyncio.to_thread(self._checkpoint_page, offset, response_json)
+            return result
+
+    async def enrich_properties(self, properties: list[Property]) -> None:
+        with self.tracer.start_as_current_span("enrich_properties", attributes={"properties": len(properties)}) as span:
+            cached_details = await asyncio.to_thread(self._cached_details, properties)
+            span.set_attribute("cached", len(cached_details))
+
+            fetched_details = {}
+            batches = self._details_batches(properties, cached_details)
+            for batch, batch_details in zip(
+                batches,
+                await asyncio.gather(
+                    *(self.get_prop_details_batch(batch) for batch in batches), return_exceptions=True
+                ),
+            ):
+                if isinstance(batch_details, dict):
+                    fetched_details.update(batch_details)
+                    await asyncio.to_thread(self._checkpoint_details, batch_details)
+                else:
+                    self._skipped(batch_details, details=len(batch))
+
+            await asyncio.to_thread(self._store_details, fetched_details)
+            self._apply_details(properties, cached_details | fetched_details)
+
+    @retry(
+        retry=retry_if_exception_type(JSONDecodeError),
+        wait=wait_exponential(min=4, max=10),
+        stop=stop_after_attempt(3),
+    )
+    async def get_prop_details_batch(self, property_ids: list[str]) -> dict[str, dict]:
+        if not self.extra_property_data or not property_ids:
+            return {}
+
+        with self.tracer.start_as_current_span(
+            "get_prop_details_batch", attributes={"properties": len(property_ids)}
+        ) as span:
+            aliases = {f"home_{i}": property_id for i, property_id in enumerate(property_ids)}
+            response_json = await self._request(
+                "POST", self.SEARCH_GQL_URL, endpoint="details", json=self._details_batch_payload(aliases)
+            )
+
+            prop_details, failed_property_ids = self._parse_details_batch(response_json, aliases)
+            span.set_attribute("failed", len(failed_property_ids))
+
+            retried_details = await asyncio.gather(*(self.get_prop_details(pid) for pid in failed_property_ids))
+            prop_details.update(zip(failed_property_ids, retried_details))
+
+            return prop_details
+
+    @retry(
+        retry=retry_if_exception_type(JSONDecodeError),
+        wait=wait_exponential(min=4, max=10),
+        stop=stop_after_attempt(3),
+    )
+    async def get_prop_details(self, property_id: str) -> dict:
+        if not self.extra_property_data:
+            return {}
+
+        with self.tracer.start_as_current_span("get_prop_details", attributes={"property_id": property_id}):
+            response_json = await self._request(
+                "POST", self.SEARCH_GQL_URL, endpoint="details", json=self._details_payload(property_id)
+            )
+
+            property_details = self.get_key(response_json, ["data", "home"])
+            if not property_details:
+                return {}
+
+            return self.process_extra_property_details(property_details)
+
+    async def search(self) -> list[Property]:
+        self.semaphore = asyncio.Semaphore(self.NUM_PROPERTY_WORKERS)
+
+        if self.client is not None:
+            homes = await self._search()
+        else:
+            async with httpx.AsyncClient(
+                headers=DEFAULT_HEADERS,
+                http2=self.http2,
+                proxy=self.proxy,
+                limits=httpx.Limits(max_connections=self.NUM_PROPERTY_WORKERS),
+                timeout=self.REQUEST_TIMEOUT,
+                follow_redirects=True,
+            ) as client:
+                self.client = client
+                try:
+                    homes = await self._search()
+                finally:
+                    self.client = None
+
+        await asyncio.to_thread(self._clear_checkpoint)
+        return homes
+
+    def _skipped(self, exception: BaseException, **skipped) -> None:
+        """
+        Counts the work that raised as skipped if the scrape was cancelled, raises the exception otherwise
+        """
+        if not isinstance(exception, Exception) or not self.cancellation.cancelled:
+            raise exception
+
+        self.cancellation.skip(**skipped)
+
+    async def _search(self) -> list[Property]:
+        try:
+            return await self._search_pages()
+        except Exception as exception:
+            if self.scraper_input.shard:
+                self._skipped(exception, shards=1)
+            else:
+                self._skipped(exception, pages=1)
+
+            return []
+
+    async def _search_pages(self) -> list[Property]:
+        location_info = await self.handle_location()
+        if not location_info:
+            return []
+
+        search_plan = self._search_variables(location_info)
+        if not search_plan:
+            return []
+
+        search_type, search_variables = search_plan
+        if search_type == "address":
+            return await self.handle_home(search_variables["property_id"])
+
+        result = await self.general_search(search_variables, search_type=search_type)
+        homes = result["properties"]
+        self.total = result["total"]
+
+        if self.watermark_store is not None:  #: incremental pages are fetched in order, until the watermark
+            for offset in self._page_offsets(result["total"]):
+                if result["reached_watermark"]:
+                    break
+
+                try:
+                    result = await self.general_search(search_variables | {"offset": offset}, search_type=search_type)
+                except Exception as exception:  #: the watermark isn't moved past pages that weren't fetched
+                    self._skipped(exception, pages=1)
+                    return homes
+
+                homes.extend(result["properties"])
+
+            await asyncio.to_thread(self._save_watermark, result)
+            return homes
+
+        if shard_inputs := self._plan_shards(result["total"]):
+            shards = [AsyncRealtorScraper(shard_input, client=self.client) for shard_input in shard_inputs]
+            for shard in shards:
+                shard.semaphore = self.semaphore
+
+            shard_pages = await asyncio.gather(*(shard._search() for shard in shards))
+            for shard in shards:
+                self._count_shard_total(shard.total)
+
+            seen = {realty_property.property_id for realty_property in homes}
+            for page in self._dedupe_pages(shard_pages, seen):
+                homes.extend(page)
+
+            return homes
+
+        for page in await asyncio.gather(
+            *(
+                self.general_search(variables=search_variables | {"offset": i}, search_type=search_type)
+                for i in self._page_offsets(result["total"])
+            ),
+            return_exceptions=True,
+        ):
+            if isinstance(page, dict):
+                homes.extend(page["properties"])
+            else:
+                self._skipped(page, pages=1)
+
+        return homes
@@ -0,0 +1,82 @@
+"""
+homeharvest.realtor.locations
+~~~~~~~~~~~~
+
+Resolves search locations to realtor.com autocomplete results, skipping the autocomplete request for zip codes,
+gazetteer entries & locations that have already been resolved.
+"""
+
+from __future__ import annotations
+
+import csv
+import re
+
+from ...cache import MemoryCache, SQLiteCache, DAY
+
+ZIP_CODE = re.compile(r"^\d{5}$")
+GAZETTEER_FIELDS = ("area_type", "city", "county", "state_code", "postal_code")
+
+
+class LocationResolver:
+    """
+    :param gazetteer: Offline locations, either a dict of location -> autocomplete fields (area_type, city, county,
+    state_code, postal_code) or the path of a CSV file with a location column and those fields,
+    e.g. `"Dallas, TX",city,Dallas,,TX,`
+    :param path: If set, resolved locations are also persisted to this SQLite file and reused across runs.
+    :param ttl: Seconds before a resolved location is looked up again.
+    """
+
+    def __init__(
+        self,
+        gazetteer: dict[str, dict] | str | None = None,
+        path: str | None = None,
+        ttl: float = 30 * DAY,
+        max_entries: int = 4096,
+    ):
+        self.gazetteer = self._load_gazetteer(gazetteer) if isinstance(gazetteer, str) else gazetteer or {}
+        self.gazetteer = {self.normalize(location): info for location, info in self.gazetteer.items()}
+        self.memory = MemoryCache(max_entries=max_entries)
+        self.store = SQLiteCache(path) if path else None
+        self.ttl = ttl
+
+    @staticmethod
+    def normalize(location: str) -> str:
+        return " ".join(location.lower().split())
+
+    @staticmethod
+    def _load_gazetteer(path: str) -> dict[str, dict]:
+        with open(path, newline="") as gazetteer_file:
+            return {
+                row["location"]: {field: row[field] for field in GAZETTEER_FIELDS if row.get(field)}
+                for row in csv.DictReader(gazetteer_file)
+            }
+
+    def resolve(self, location: str) -> dict | None:
+        """
+        Returns the autocomplete result for a location without a network request, or None if it must be looked up
+        """
+        key = self.normalize(location)
+
+        if ZIP_CODE.match(key):
+            return {"area_type": "postal_code", "postal_code": key}
+
+        if (location_info := self.gazetteer.get(key)) is not None:
+            return dict(location_info)
+
+        if (location_info := self.memory.get(key)) is not None:
+            return dict(location_info)
+
+        if self.store is not None and (location_info := self.store.get(key)) is not None:
+            self.memory.set(key, location_info, ttl=self.ttl)
+            return dict(location_info)
+
+        return None
+
+    def remember(self, location: str, location_info: dict | None) -> None:
+        if not location_info:
+            return
+
+        key = self.normalize(location)
+        self.memory.set(key, location_info, ttl=self.ttl)
+        if self.store is not None:
+            self.store.set(key, location_info, ttl=self.ttl)
@@ -121,12 +121,14 @@ _SEARCH_HOMES_DATA_BASE = """{
     }
     """
 
-HOMES_DATA = """%s
+PROPERTY_DETAILS_DATA = """
                 nearbySchools: nearby_schools(radius: 5.0, limit_per_level: 3) {
                             __typename schools { district { __typename id name } }
                         }
                 taxHistory: tax_history { __typename tax year assessment { __typename building land total } }
-                estimates {
+"""
+
+HOMES_DATA = """%s%s                estimates {
                     __typename
                     currentValues: current_values {
                         __typename
@@ -138,7 +140,10 @@ HOMES_DATA = """%s
                         isBestHomeValue: isbest_homevalue
                     }
                 }
-}""" % _SEARCH_HOMES_DATA_BASE
+}""" % (
+    _SEARCH_HOMES_DATA_BASE,
+    PROPERTY_DETAILS_DATA,
+)
 
 SEARCH_HOMES_DATA = """%s
                     current_estimates {
@@ -161,3 +166,133 @@ GENERAL_RESULTS_QUERY = """{
                             total
                             results %s
                         }""" % SEARCH_HOMES_DATA
+
+
+_PHONE_FIELDS = ("number", "type", "primary", "ext")
+
+#: the home_search result fields each output column is parsed from
+COLUMN_FIELDS = {
+    "property_url": ("href",),
+    "property_id": ("property_id",),
+    "listing_id": ("listing_id",),
+    "mls": ("source.id",),
+    "mls_id": ("source.listing_id",),
+    "status": ("status", "flags.is_pending", "flags.is_contingent"),
+    "text": ("description.text",),
+    "style": ("description.type",),
+    "full_street_line": ("location.address.line",),
+    "street": (
+        "location.address.street_number",
+        "location.address.street_direction",
+        "location.address.street_name",
+        "location.address.street_suffix",
+    ),
+    "unit": ("location.address.unit",),
+    "city": ("location.address.city",),
+    "state": ("location.address.state_code",),
+    "zip_code": ("location.address.postal_code",),
+    "beds": ("description.beds",),
+    "full_baths": ("description.baths_full",),
+    "half_baths": ("description.baths_half",),
+    "sqft": ("description.sqft",),
+    "year_built": ("description.year_built",),
+    "days_on_mls": ("list_date", "last_sold_date", "status"),
+    "list_price": ("list_price",),
+    "list_price_min": ("list_price_min",),
+    "list_price_max": ("list_price_max",),
+    "list_date": ("list_date",),
+    "sold_price": ("last_sold_price", "last_sold_date", "list_price"),
+    "last_sold_date": ("last_sold_date",),
+    "assessed_value": (),
+    "estimated_value": ("current_estimates.estimate",),
+    "tax": (),
+    "tax_history": (),
+    "new_construction": ("flags.is_new_construction",),
+    "lot_sqft": ("description.lot_sqft",),
+    "price_per_sqft": ("price_per_sqft",),
+    "latitude": ("location.address.coordinate.lat",),
+    "longitude": ("location.address.coordinate.lon",),
+    "neighborhoods": ("location.neighborhoods.name",),
+    "county": ("location.county.name",),
+    "fips_code": ("location.county.fips_code",),
+    "stories": ("description.stories",),
+    "hoa_fee": ("hoa.fee",),
+    "parking_garage": ("description.garage",),
+    "agent_id": ("advertisers.type", "advertisers.fulfillment_id"),
+    "agent_name": ("advertisers.type", "advertisers.name"),
+    "agent_email": ("advertisers.type", "advertisers.email"),
+    "agent_phones": ("advertisers.type", *(f"advertisers.phones.{field}" for field in _PHONE_FIELDS)),
+    "agent_mls_set": ("advertisers.type", "advertisers.mls_set"),
+    "agent_nrds_id": ("advertisers.type", "advertisers.nrds_id"),
+    "broker_id": ("advertisers.type", "advertisers.broker.name", "advertisers.broker.fulfillment_id"),
+    "broker_name": ("advertisers.type", "advertisers.broker.name"),
+    "builder_id": ("advertisers.type", "advertisers.builder.fulfillment_id"),
+    "builder_name": ("advertisers.type", "advertisers.builder.name"),
+    "office_id": ("advertisers.type", "advertisers.office.fulfillment_id"),
+    "office_mls_set": ("advertisers.type", "advertisers.office.mls_set"),
+    "office_name": ("advertisers.type", "advertisers.office.name"),
+    "office_email": ("advertisers.type", "advertisers.office.email"),
+    "office_phones": ("advertisers.type", *(f"advertisers.office.phones.{field}" for field in _PHONE_FIELDS)),
+    "nearby_schools": (),
+    "primary_photo": ("primary_photo.href",),
+    "alt_photos": ("photos.href",),
+}
+
+#: fields every search needs, whatever its columns (dedupe, status & pending listings)
+REQUIRED_FIELDS = ("property_id", "href", "status", "flags.is_pending", "flags.is_contingent")
+
+#: columns filled in by the extra property data requests
+DETAILS_COLUMNS = ("nearby_schools", "assessed_value", "tax", "tax_history")
+ADDRESS_COLUMNS = ("full_street_line", "street", "unit", "city", "state", "zip_code")
+DESCRIPTION_COLUMNS = (
+    "text",
+    "style",
+    "beds",
+    "full_baths",
+    "half_baths",
+    "sqft",
+    "year_built",
+    "sold_price",
+    "lot_sqft",
+    "stories",
+    "parking_garage",
+    "primary_photo",
+    "alt_photos",
+)
+ADVERTISER_COLUMNS = tuple(column for column, fields in COLUMN_FIELDS.items() if "advertisers.type" in fields)
+
+
+def selection_set(fields) -> str:
+    """
+    Compiles dotted field paths (e.g. location.address.city) into a GraphQL selection set
+    """
+    tree = {}
+    for field in fields:
+        node = tree
+        for name in field.split("."):
+            node = node.setdefault(name, {})
+
+    def render(node: dict, indent: str) -> str:
+        lines = [
+            f"{indent}    {name} {render(children, indent + '    ')}" if children else f"{indent}    {name}"
+            for name, children in node.items()
+        ]
+        return "{\n%s\n%s}" % ("\n".join(lines), indent)
+
+    return render(tree, "")
+
+
+def general_results_query(fields) -> str:
+    """
+    GENERAL_RESULTS_QUERY, selecting only the given result fields
+    """
+    results = selection_set(fields)
+
+    return (
+        """{
+                            count
+                            total
+                            results %s
+                        }"""
+        % results
+    )
@@ -0,0 +1,149 @@
+"""
+homeharvest.core.state
+~~~~~~~~~~~~
+
+Persistent state kept between runs of the same search.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import zlib
+
+from .cache import SQLiteCache
+
+
+def _encode(value) -> bytes:
+    return zlib.compress(json.dumps(value, separators=(",", ":")).encode())
+
+
+def _decode(value: bytes):
+    return json.loads(zlib.decompress(value))
+
+
+class WatermarkStore:
+    """
+    Stores, per normalized search, the newest list/sold date seen and the property_ids seen at that date. Searches
+    run with a watermark store only return (and enrich) listings newer than the previous run's watermark, and stop
+    paging once they reach it.
+    """
+
+    DEFAULT_PATH = "~/.cache/homeharvest/watermarks.sqlite"
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.backend = SQLiteCache(path)
+
+    def get(self, query_key: str) -> dict | None:
+        return self.backend.get(query_key)
+
+    def set(self, query_key: str, date: str, property_ids: list[str]) -> None:
+        self.backend.set(query_key, {"date": date, "property_ids": sorted(property_ids)})
+
+    def reset(self, query_key: str) -> None:
+        self.backend.delete(query_key)
+
+
+class Checkpoint:
+    """
+    Journals searches as they run: the search response of each completed page (of each shard) and the extra property
+    data fetched so far, keyed by the job (the query_key of the search) and JSON encoded & zlib compressed like
+    SQLiteCache's values. If a search dies, running it again with resume=True parses the journaled pages again
+    instead of fetching them, and skips the properties whose extra property data was already fetched. The journal of
+    a job is cleared when its search completes, or when it's run again without resume; the jobs of other searches
+    sharing the file are left as they are.
+    :param resume: Default of the scrapes' resume parameter, for the searches journaled here.
+    """
+
+    DEFAULT_PATH = "~/.cache/homeharvest/checkpoints.sqlite"
+
+    def __init__(self, path: str = DEFAULT_PATH, resume: bool = False):
+        self.path = os.path.expanduser(path)
+        self.resume = resume
+        self.resumed_pages = 0
+        self.resumed_details = 0
+
+        if directory := os.path.dirname(self.path):
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS pages (job TEXT NOT NULL, key TEXT NOT NULL, page BLOB NOT NULL, "
+            "PRIMARY KEY (job, key))"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS details (job TEXT NOT NULL, property_id TEXT NOT NULL, details BLOB NOT NULL, "
+            "PRIMARY KEY (job, property_id))"
+        )
+
+    def get_page(self, job: str, key: str) -> dict | None:
+        with self._lock:
+            row = self._connection.execute("SELECT page FROM pages WHERE job = ? AND key = ?", (job, key)).fetchone()
+
+            if row is None:
+                return None
+
+            self.resumed_pages += 1
+
+        return _decode(row[0])
+
+    def set_page(self, job: str, key: str, page: dict) -> None:
+        value = _encode(page)
+
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO pages (job, key, page) VALUES (?, ?, ?)", (job, key, value)
+            )
+
+    def get_details(self, job: str, property_ids: list[str]) -> dict[str, dict]:
+        prop_details = {}
+
+        with self._lock:
+            for i in range(0, len(property_ids), 500):  #: below SQLite's limit of variables per statement
+                batch = property_ids[i : i + 500]
+                rows = self._connection.execute(
+                    "SELECT property_id, details FROM details WHERE job = ? AND property_id IN (%s)"
+                    % ", ".join("?" * len(batch)),
+                    (job, *batch),
+                ).fetchall()
+                prop_details.update((property_id, _decode(value)) for property_id, value in rows)
+
+            self.resumed_details += len(prop_details)
+
+        return prop_details
+
+    def set_details(self, job: str, prop_details: dict[str, dict]) -> None:
+        rows = [(job, property_id, _encode(details)) for property_id, details in prop_details.items()]
+
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO details (job, property_id, details) VALUES (?, ?, ?)", rows
+            )
+
+    def clear(self, job: str) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM pages WHERE job = ?", (job,))
+            self._connection.execute("DELETE FROM details WHERE job = ?", (job,))
+
+    def stats(self, job: str | None = None) -> dict[str, int]:
+        """
+        Counts the pages & extra property data journaled for the job (or for every job), and those resumed through
+        this Checkpoint
+        """
+        with self._lock:
+            pages, details = self._connection.execute(
+                "SELECT (SELECT COUNT(*) FROM pages WHERE ? IS NULL OR job = ?), "
+                "(SELECT COUNT(*) FROM details WHERE ? IS NULL OR job = ?)",
+                (job, job, job, job),
+            ).fetchone()
+
+            return {
+                "journaled_pages": pages,
+                "journaled_details": details,
+                "resumed_pages": self.resumed_pages,
+                "resumed_details": self.resumed_details,
+            }
@@ -0,0 +1,219 @@
+"""
+homeharvest.core.tracing
+~~~~~~~~~~~~
+
+Tracing spans around each phase of a scrape (location, search pages, extra property data, parsing, DataFrame), with
+the same API as OpenTelemetry tracers, so an OpenTelemetry tracer can be passed as is. The default tracer does nothing.
+Also a cProfile profiler covering the scheduler's worker threads.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import contextvars
+import functools
+import json
+import os
+import pstats
+import threading
+import time
+from typing import Callable
+
+
+class NoopSpan:
+    def __enter__(self) -> NoopSpan:
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+    def set_attribute(self, key: str, value) -> None:
+        pass
+
+    def set_attributes(self, attributes: dict) -> None:
+        pass
+
+    def is_recording(self) -> bool:
+        return False
+
+
+class NoopTracer:
+    """
+    Returns the same span, doing nothing, for every phase
+    """
+
+    _span = NoopSpan()
+
+    def start_as_current_span(self, name: str, attributes: dict | None = None, **kwargs) -> NoopSpan:
+        return self._span
+
+
+NOOP_TRACER = NoopTracer()
+
+
+class RecordedSpan:
+    def __init__(self, tracer: RecordingTracer, name: str, attributes: dict | None):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.parent: RecordedSpan | None = None
+        self.thread = threading.current_thread().name
+        self.start = self.end = 0.0
+        self._token = None
+
+    def __enter__(self) -> RecordedSpan:
+        self.parent = self.tracer.current_span.get()
+        self._token = self.tracer.current_span.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        self.end = time.perf_counter()
+        self.tracer.current_span.reset(self._token)
+
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+
+        self.tracer.record(self)
+        return False
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: dict) -> None:
+        self.attributes.update(attributes)
+
+    def is_recording(self) -> bool:
+        return True
+
+
+class RecordingTracer:
+    """
+    Keeps every finished span in memory, e.g. to find a scrape's critical path without an OpenTelemetry setup. Spans
+    started in the scheduler's worker threads are children of the span that scheduled them.
+    """
+
+    def __init__(self):
+        self.spans: list[RecordedSpan] = []
+        self.current_span: contextvars.ContextVar[RecordedSpan | None] = contextvars.ContextVar(
+            f"homeharvest_span_{id(self)}", default=None
+        )
+        self._lock = threading.Lock()
+
+    def start_as_current_span(self, name: str, attributes: dict | None = None, **kwargs) -> RecordedSpan:
+        return RecordedSpan(self, name, attributes)
+
+    def record(self, span: RecordedSpan) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self) -> dict[str, dict]:
+        """
+        The number of spans and total & maximum seconds spent per span name
+        """
+        summary: dict[str, dict] = {}
+        with self._lock:
+            for span in self.spans:
+                phase = summary.setdefault(span.name, {"count": 0, "total": 0.0, "max": 0.0})
+                phase["count"] += 1
+                phase["total"] += span.duration
+                phase["max"] = max(phase["max"], span.duration)
+
+        return {
+            name: {**phase, "total": round(phase["total"], 6), "max": round(phase["max"], 6)}
+            for name, phase in summary.items()
+        }
+
+    def to_chrome_trace(self, path: str) -> None:
+        """
+        Writes the spans as a Trace Event Format file, a per-thread timeline viewable in Perfetto or chrome://tracing
+        """
+        with self._lock:
+            spans = list(self.spans)
+
+        origin = min((span.start for span in spans), default=0.0)
+        events = [
+            {
+                "name": span.name,
+                "ph": "X",
+                "ts": round((span.start - origin) * 1e6),
+                "dur": round(span.duration * 1e6),
+                "pid": os.getpid(),
+                "tid": span.thread,
+                "args": {key: str(value) for key, value in span.attributes.items()},
+            }
+            for span in spans
+        ]
+
+        with open(os.path.expanduser(path), "w") as trace_file:
+            json.dump({"traceEvents": events}, trace_file)
+
+
+class Profiler:
+    """
+    Profiles a scrape with cProfile, including the tasks it runs on the scheduler's worker threads, and writes the
+    merged stats to path once the scrape is done. The file can be read with pstats, snakeviz, or turned into a
+    flamegraph with flameprof or gprof2dot.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        self.stats: pstats.Stats | None = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> Profiler:
+        self._start()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        self._stop()
+        self.dump()
+        return False
+
+    def _start(self) -> None:
+        self._local.nested = getattr(self._local, "nested", 0) + 1
+        if self._local.nested > 1:  #: this thread is already profiled
+            return
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  #: from python 3.12, the profile of the calling thread covers every thread
+            profile = None
+
+        self._local.profile = profile
+
+    def _stop(self) -> None:
+        self._local.nested -= 1
+        if self._local.nested or (profile := self._local.profile) is None:
+            return
+
+        profile.disable()
+        self._local.profile = None
+
+        with self._lock:
+            if self.stats is None:
+                self.stats = pstats.Stats(profile)
+            else:
+                self.stats.add(profile)
+
+    def wrap(self, fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def profiled(*args, **kwargs):
+            self._start()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._stop()
+
+        return profiled
+
+    def dump(self) -> None:
+        with self._lock:
+            if self.stats is not None:
+                self.stats.dump_stats(self.path)
@@ -0,0 +1,285 @@
+"""
+homeharvest.core.transport
+~~~~~~~~~~~~
+
+Transports send the scrapers' HTTP requests. request(method, url, **kwargs) takes requests-style keyword arguments
+(params, json, data, headers) and returns a response with status_code, content & json().
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from ..exceptions import ReplayError
+from .scheduler import DEFAULT_SCHEDULER
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+DEFAULT_HEADERS = {
+    "accept": "application/json, text/javascript",
+    "accept-language": "en-US,en;q=0.9",
+    "cache-control": "no-cache",
+    "content-type": "application/json",
+    "origin": "https://www.realtor.com",
+    "pragma": "no-cache",
+    "priority": "u=1, i",
+    "rdc-ab-tests": "commute_travel_time_variation:v1",
+    "sec-ch-ua": '"Not)A;Brand";v="99", "Google Chrome";v="127", "Chromium";v="127"',
+    "sec-ch-ua-mobile": "?0",
+    "sec-ch-ua-platform": '"Windows"',
+    "sec-fetch-dest": "empty",
+    "sec-fetch-mode": "cors",
+    "sec-fetch-site": "same-origin",
+    "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36",
+}
+
+
+@dataclass
+class TransportResponse:
+    status_code: int
+    content: bytes
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class Transport:
+    """
+    :param hosts: Sends the requests for these hosts to other origins instead, e.g. {"www.realtor.com":
+    "http://localhost:8000"} for a local stand-in server.
+    """
+
+    #: transports pacing their own requests (e.g. per proxy), or not sending any (replays), bypass the scraper's rate
+    #: limiter, and are passed the scrape's CancellationToken (cancellation=) so they stop waiting once it's cancelled
+    paces_requests = False
+
+    def __init__(self, hosts: dict[str, str] | None = None):
+        self.hosts = hosts or {}
+
+    def request(self, method: str, url: str, **kwargs):
+        raise NotImplementedError
+
+    def _url(self, url: str) -> str:
+        parts = urlsplit(url)
+        if (origin := self.hosts.get(parts.hostname)) is None:
+            return url
+
+        origin = urlsplit(origin)
+        return urlunsplit((origin.scheme, origin.netloc, parts.path, parts.query, parts.fragment))
+
+
+class RequestsTransport(Transport):
+    """
+    Sends requests on a requests session with DEFAULT_HEADERS, retrying connection errors. Transports created without
+    a session share one per pool_size, so connections are reused across searches.
+    :param pool_size: Connections kept open per host, at least the number of threads sending requests at once.
+    """
+
+    DEFAULT_POOL_SIZE = 10
+    shared_sessions: dict[int, requests.Session] = {}
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        session: requests.Session | None = None,
+        proxy: str | None = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+
+        self.session = session or self._shared_session(pool_size)
+        self.proxies = {"http": proxy, "https": proxy} if proxy else None
+
+    @classmethod
+    def _shared_session(cls, pool_size: int) -> requests.Session:
+        with cls._lock:
+            if (session := cls.shared_sessions.get(pool_size)) is None:
+                session = cls.shared_sessions[pool_size] = cls.create_session(pool_size)
+
+        return session
+
+    @staticmethod
+    def create_session(pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+        session = requests.Session()
+
+        #: 429/403 responses are retried by Scraper._send, under the rate limiter's shared backoff
+        retries = Retry(total=3, backoff_factor=4, allowed_methods=frozenset(["GET", "POST"]))
+
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update(DEFAULT_HEADERS)
+
+        return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        if self.proxies:
+            kwargs.setdefault("proxies", self.proxies)
+
+        return self.session.request(method, self._url(url), **kwargs)
+
+
+class HttpxTransport(Transport):
+    """
+    Sends requests on an httpx client. If http2 is set (pip install homeharvest[http2]), every request in flight to a
+    host is multiplexed over the same connection.
+    :param pool_size: Maximum connections kept open, at least the number of threads sending requests at once.
+    """
+
+    REQUEST_TIMEOUT = 30
+    shared_transports: dict[tuple, HttpxTransport] = {}
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        http2: bool = False,
+        proxy: str | None = None,
+        client: "httpx.Client | None" = None,
+        pool_size: int = RequestsTransport.DEFAULT_POOL_SIZE,
+        **kwargs,
+    ):
+        if httpx is None:
+            raise ImportError("HttpxTransport requires httpx, install it with: pip install homeharvest[async]")
+
+        super().__init__(**kwargs)
+
+        self.client = client or httpx.Client(
+            headers=DEFAULT_HEADERS,
+            http2=http2,
+            proxy=proxy,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=self.REQUEST_TIMEOUT,
+            follow_redirects=True,
+        )
+
+    @classmethod
+    def shared(
+        cls, http2: bool = False, proxy: str | None = None, pool_size: int = RequestsTransport.DEFAULT_POOL_SIZE
+    ) -> HttpxTransport:
+        """
+        Returns the transport shared by every search with the same options, so its connections are reused
+        """
+        with cls._lock:
+            if (transport := cls.shared_transports.get((http2, proxy, pool_size))) is None:
+                transport = cls(http2=http2, proxy=proxy, pool_size=pool_size)
+                cls.shared_transports[(http2, proxy, pool_size)] = transport
+
+        return transport
+
+    def request(self, method: str, url: str, **kwargs) -> "httpx.Response":
+        if isinstance(kwargs.get("data"), (str, bytes)):  #: httpx only accepts raw bodies as content
+            kwargs["content"] = kwargs.pop("data")
+
+        return self.client.request(method, self._url(url), **kwargs)
+
+    def close(self) -> None:
+        self.client.close()
+
+
+class RoutingTransport(Transport):
+    """
+    Sends the requests of the given hosts with their own transport, and every other request with the default one
+    """
+
+    def __init__(self, routes: dict[str, Transport], default: Transport):
+        super().__init__()
+
+        self.routes = routes
+        self.default = default
+
+    def request(self, method: str, url: str, **kwargs):
+        return self.routes.get(urlsplit(url).hostname, self.default).request(method, url, **kwargs)
+
+
+def request_key(method: str, url: str, **kwargs) -> str:
+    request = {
+        "method": method.upper(),
+        "url": url,
+        "params": kwargs.get("params"),
+        "json": kwargs.get("json"),
+        "data": kwargs.get("data"),
+    }
+
+    return hashlib.sha256(json.dumps(request, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class RecordingTransport(Transport):
+    """
+    Sends requests with another transport & appends every exchange to a JSON lines file, for ReplayTransport
+    :param pool_size: Connections kept open per host when no transport is given. Defaults to the number of workers of
+    DEFAULT_SCHEDULER.
+    """
+
+    def __init__(self, path: str, transport: Transport | None = None, pool_size: int | None = None):
+        super().__init__()
+
+        self.path = os.path.expanduser(path)
+        self.transport = transport or RequestsTransport(pool_size=pool_size or DEFAULT_SCHEDULER.workers)
+        self.paces_requests = self.transport.paces_requests
+        self._lock = threading.Lock()
+
+        if directory := os.path.dirname(self.path):
+            os.makedirs(directory, exist_ok=True)
+
+    def request(self, method: str, url: str, **kwargs):
+        response = self.transport.request(method, url, **kwargs)
+
+        exchange = {
+            "key": request_key(method, url, **kwargs),
+            "method": method.upper(),
+            "url": url,
+            "status_code": response.status_code,
+            "content": response.content.decode("utf-8", errors="replace"),
+        }
+
+        with self._lock, open(self.path, "a") as recording:
+            recording.write(json.dumps(exchange) + "\n")
+
+        return response
+
+
+class ReplayTransport(Transport):
+    """
+    Answers requests from a RecordingTransport file without the network. Identical requests are answered in the order
+    they were recorded, repeating the last answer once they run out.
+    """
+
+    #: replayed responses are answered as fast as they're requested, instead of by the scraper's rate limiter
+    paces_requests = True
+
+    def __init__(self, path: str):
+        super().__init__()
+
+        self.exchanges: defaultdict[str, deque[dict]] = defaultdict(deque)
+        self._lock = threading.Lock()
+
+        with open(os.path.expanduser(path)) as recording:
+            for line in recording:
+                if line.strip():
+                    exchange = json.loads(line)
+                    self.exchanges[exchange["key"]].append(exchange)
+
+    def request(self, method: str, url: str, cancellation=None, **kwargs) -> TransportResponse:
+        key = request_key(method, url, **kwargs)
+
+        with self._lock:
+            if not (exchanges := self.exchanges.get(key)):
+                raise ReplayError(f"No recorded response for {method.upper()} {url}")
+
+            exchange = exchanges.popleft() if len(exchanges) > 1 else exchanges[0]
+
+        return TransportResponse(status_code=exchange["status_code"], content=exchange["content"].encode("utf-8"))
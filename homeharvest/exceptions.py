@@ -12,3 +12,11 @@ class AuthenticationError(Exception):
         super().__init__(*args)
 
         self.response = response
+
+
+class ReplayError(Exception):
+    """Raised when a ReplayTransport is sent a request that was not recorded."""
+
+
+class ScrapeCancelled(Exception):
+    """Raised inside a scrape once its CancellationToken is cancelled or its deadline has passed."""
@@ -1,6 +1,8 @@
 from __future__ import annotations
 import pandas as pd
 from datetime import datetime
+from operator import attrgetter
+from typing import Iterable
 from .core.scrapers.models import Property, ListingType, Advertisers
 from .exceptions import InvalidListingType, InvalidDate
 
@@ -67,12 +69,57 @@ ordered_properties = [
 ]
 
 
-def process_result(result: Property) -> pd.DataFrame:
-    prop_data = {prop: None for prop in ordered_properties}
-    prop_data.update(result.__dict__)
+#: columns copied verbatim from the Property attribute of the same name
+_property_columns = [
+    "property_url",
+    "property_id",
+    "listing_id",
+    "mls",
+    "mls_id",
+    "status",
+    "list_price",
+    "list_price_min",
+    "list_price_max",
+    "list_date",
+    "last_sold_date",
+    "assessed_value",
+    "estimated_value",
+    "tax",
+    "tax_history",
+    "new_construction",
+    "latitude",
+    "longitude",
+    "neighborhoods",
+    "county",
+    "fips_code",
+    "hoa_fee",
+    "days_on_mls",
+]
+
+_get_property_columns = attrgetter(*_property_columns)
+
+_null_values = ("None", "")
+
 
-    if "address" in prop_data:
-        address_data = prop_data["address"]
+def _normalize(value):
+    """Maps the placeholder values realtor.com uses for missing data onto pd.NA"""
+    if value is None or (isinstance(value, str) and value in _null_values):
+        return pd.NA
+
+    return value
+
+
+def flatten_property(result: Property) -> dict:
+    """
+    Flattens a Property (and its nested address, description & advertisers) into a single row keyed by
+    ordered_properties, with missing values already normalized to pd.NA.
+    """
+    prop_data = dict.fromkeys(ordered_properties)
+
+    prop_data.update(zip(_property_columns, _get_property_columns(result)))
+
+    address_data = result.address
+    if address_data:
         prop_data["full_street_line"] = address_data.full_line
         prop_data["street"] = address_data.street
         prop_data["unit"] = address_data.unit
@@ -80,8 +127,8 @@ def process_result(result: Property) -> pd.DataFrame:
         prop_data["state"] = address_data.state
         prop_data["zip_code"] = address_data.zip
 
-    if "advertisers" in prop_data and prop_data.get("advertisers"):
-        advertiser_data: Advertisers | None = prop_data["advertisers"]
+    advertiser_data: Advertisers | None = result.advertisers
+    if advertiser_data:
         if advertiser_data.agent:
             agent_data = advertiser_data.agent
             prop_data["agent_id"] = agent_data.uuid
@@ -109,9 +156,9 @@ def process_result(result: Property) -> pd.DataFrame:
             prop_data["office_phones"] = office_data.phones
             prop_data["office_mls_set"] = office_data.mls_set
 
-    prop_data["price_per_sqft"] = prop_data["prc_sqft"]
-    prop_data["nearby_schools"] = filter(None, prop_data["nearby_schools"]) if prop_data["nearby_schools"] else None
-    prop_data["nearby_schools"] = ", ".join(set(prop_data["nearby_schools"])) if prop_data["nearby_schools"] else None
+    prop_data["price_per_sqft"] = result.prc_sqft
+    nearby_schools = filter(None, result.nearby_schools) if result.nearby_schools else None
+    prop_data["nearby_schools"] = ", ".join(set(nearby_schools)) if nearby_schools else None
 
     description = result.description
     if description:
@@ -133,10 +180,56 @@ def process_result(result: Property) -> pd.DataFrame:
         prop_data["stories"] = description.stories
         prop_data["text"] = description.text
 
-    properties_df = pd.DataFrame([prop_data])
-    properties_df = properties_df.reindex(columns=ordered_properties)
+    return {column: _normalize(value) for column, value in prop_data.items()}
+
+
+class PropertyFrameBuilder:
+    """
+    Columnar accumulator for Property results. Each property is flattened straight into per-column lists,
+    and a single DataFrame (in ordered_properties order, or the order of the given columns) is built once at the end.
+    """
+
+    def __init__(self, columns: list[str] | None = None):
+        self.columns: dict[str, list] = {column: [] for column in columns or ordered_properties}
+        self.rows = 0
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def add(self, result: Property) -> None:
+        row = flatten_property(result)
+        for column, values in self.columns.items():
+            values.append(row[column])
+
+        self.rows += 1
+
+    def extend(self, results: Iterable[Property]) -> "PropertyFrameBuilder":
+        for result in results:
+            if result:
+                self.add(result)
+
+        return self
 
-    return properties_df[ordered_properties]
+    def build(self) -> pd.DataFrame:
+        if not self.rows:
+            return pd.DataFrame()
+
+        #: like concatenating single-row DataFrames, a column keeps an inferred dtype only when no row is missing it
+        return pd.DataFrame(
+            {
+                column: pd.Series(values, dtype=object if any(value is pd.NA for value in values) else None)
+                for column, values in self.columns.items()
+            },
+            columns=list(self.columns),
+        )
+
+
+def process_result(result: Property, columns: list[str] | None = None) -> pd.DataFrame:
+    return PropertyFrameBuilder(columns).extend([result]).build()
+
+
+def process_results(results: Iterable[Property], columns: list[str] | None = None) -> pd.DataFrame:
+    return PropertyFrameBuilder(columns).extend(results).build()
 
 
 def validate_input(listing_type: str) -> None:
@@ -159,8 +252,28 @@ def validate_dates(date_from: str | None, date_to: str | None) -> None:
             raise InvalidDate(f"Invalid date format or range")
 
 
-def validate_limit(limit: int) -> None:
-    #: 1 -> 10000 limit
+def validate_limit(limit: int, auto_shard: bool = False) -> None:
+    #: 1 -> 10000 limit, unlimited when the search is sharded
+
+    if limit is not None and limit < 1:
+        raise ValueError("Property limit must be at least 1.")
+
+    if limit is not None and limit > 10000 and not auto_shard:
+        raise ValueError("Property limit must be between 1 and 10,000, unless auto_shard is set.")
+
+
+def validate_ranges(**ranges: tuple[float | None, float | None]) -> None:
+    for name, (minimum, maximum) in ranges.items():
+        if minimum is not None and maximum is not None and minimum > maximum:
+            raise ValueError(f"{name}_min must not be greater than {name}_max.")
+
+
+def validate_columns(columns: list[str] | None) -> None:
+    if columns is None:
+        return
+
+    if not columns:
+        raise ValueError("columns must list at least one column.")
 
-    if limit is not None and (limit < 1 or limit > 10000):
-        raise ValueError("Property limit must be between 1 and 10,000.")
+    if unknown_columns := [column for column in columns if column not in ordered_properties]:
+        raise ValueError(f"Unknown columns: {', '.join(unknown_columns)}.")
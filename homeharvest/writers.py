@@ -0,0 +1,118 @@
+"""
+homeharvest.writers
+~~~~~~~~~~~~
+
+Writes scrape_property_stream's DataFrame chunks to a file one search page at a time, so memory stays proportional
+to a page instead of the whole result. Every writer is a context manager with write(chunk) & rows.
+"""
+
+from __future__ import annotations
+
+import os
+
+import pandas as pd
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # pragma: no cover
+    Workbook = None
+
+
+class StreamWriter:
+    """
+    :param path: Path of the output file, overwritten if it exists.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        self.rows = 0
+
+    def __enter__(self) -> StreamWriter:
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        self.close()
+        return False
+
+    def write(self, chunk: pd.DataFrame) -> int:
+        """
+        Writes the chunk's rows, and returns how many were written
+        """
+        if chunk.empty:
+            return 0
+
+        self._write(chunk)
+        self.rows += len(chunk)
+        return len(chunk)
+
+    def _write(self, chunk: pd.DataFrame) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class CsvStreamWriter(StreamWriter):
+    """
+    Appends each chunk to the CSV file, with the header written once, and flushes it
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._file = open(self.path, "w", newline="", encoding="utf-8")
+
+    def _write(self, chunk: pd.DataFrame) -> None:
+        chunk.to_csv(self._file, header=self.rows == 0, index=False)
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class JsonLinesStreamWriter(StreamWriter):
+    """
+    Appends each chunk to the file as JSON Lines (one object per property), and flushes it
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._file = open(self.path, "w", encoding="utf-8")
+
+    def _write(self, chunk: pd.DataFrame) -> None:
+        self._file.write(chunk.to_json(orient="records", lines=True, force_ascii=False).rstrip("\n") + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ExcelStreamWriter(StreamWriter):
+    """
+    Writes the rows with openpyxl's write-only mode, which streams them to a temporary file instead of keeping every
+    cell in memory. The .xlsx file itself is only complete once the writer is closed.
+    """
+
+    def __init__(self, path: str):
+        if Workbook is None:
+            raise ImportError("Excel output requires openpyxl, install it with: pip install homeharvest[excel]")
+
+        super().__init__(path)
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet()
+
+    @staticmethod
+    def _cell(value):
+        if value is None or value is pd.NA:
+            return None
+
+        return str(value) if isinstance(value, (list, dict)) else value
+
+    def _write(self, chunk: pd.DataFrame) -> None:
+        if not self.rows:
+            self._sheet.append(list(chunk.columns))
+
+        for row in chunk.itertuples(index=False, name=None):
+            self._sheet.append([self._cell(value) for value in row])
+
+    def close(self) -> None:
+        self._workbook.save(self.path)
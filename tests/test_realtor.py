@@ -1,4 +1,40 @@
-from homeharvest import scrape_property
+import asyncio
+import sys
+import time
+import warnings
+from dataclasses import fields
+
+import pandas as pd
+import pytest
+import requests
+
+from homeharvest import (
+    scrape_property,
+    scrape_properties,
+    scrape_property_async,
+    scrape_property_stream,
+    iter_properties,
+    ResponseCache,
+    LocationResolver,
+    DetailsCache,
+    WatermarkStore,
+    RateLimiter,
+    Scheduler,
+    RecordingTransport,
+    ReplayTransport,
+    ProxyPool,
+    RecordingTracer,
+    CancellationToken,
+    Checkpoint,
+    scrape_property_arrow,
+    scrape_property_arrow_stream,
+    ParquetStreamWriter,
+)
+from homeharvest.core.scheduler import DEFAULT_SCHEDULER
+from homeharvest.core.scrapers.models import Property, Address, Description, Advertisers, Agent, Office, PropertyType
+from homeharvest.core.scrapers.realtor import RealtorScraper
+from homeharvest.core.transport import TransportResponse, HttpxTransport
+from homeharvest.utils import ordered_properties, process_results
 
 
 def test_realtor_pending_or_contingent():
@@ -287,3 +323,502 @@ def test_phone_number_matching():
 
     #: assert phone numbers are the same
     assert row["agent_phones"].values[0] == matching_row["agent_phones"].values[0]
+
+
+def test_extra_property_data_batch_size():
+    batched = scrape_property(location="Surprise, AZ", listing_type="sold", limit=50)
+    unbatched = scrape_property(
+        location="Surprise, AZ", listing_type="sold", limit=50, extra_property_data_batch_size=1
+    )
+
+    assert batched is not None and unbatched is not None
+    assert batched["tax"].notnull().sum() == unbatched["tax"].notnull().sum()
+
+
+def test_scrape_property_async():
+    async_result = asyncio.run(scrape_property_async(location="Surprise, AZ", listing_type="sold", limit=250))
+    sync_result = scrape_property(location="Surprise, AZ", listing_type="sold", limit=250)
+
+    assert async_result is not None and len(async_result) > 0
+    assert set(async_result["property_id"]) == set(sync_result["property_id"])
+
+
+def test_scrape_property_stream():
+    chunks = list(scrape_property_stream(location="Dallas, TX", listing_type="sold", limit=500, max_in_flight_pages=2))
+
+    assert len(chunks) == 3
+    assert all(len(chunk) <= 200 for chunk in chunks)
+
+    first_property = next(iter_properties(location="Dallas, TX", listing_type="sold", limit=500))
+    assert first_property.property_id is not None
+
+
+def test_scrape_properties():
+    results = scrape_properties(locations=["Dallas, TX", "75201"], listing_type="sold", past_days=30, limit=500)
+
+    assert results is not None and len(results) > 0
+    assert set(results["search_location"]) == {"Dallas, TX", "75201"}
+
+
+def test_response_cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"))
+
+    first = scrape_property(location="Surprise, AZ", listing_type="sold", limit=200, cache=cache)
+    second = scrape_property(location="Surprise, AZ", listing_type="sold", limit=200, cache=cache)
+
+    assert len(first) == len(second)
+    assert cache.stats()["search"]["hits"] > 0
+
+
+def test_location_resolver():
+    resolver = LocationResolver(gazetteer={"Dallas, TX": {"area_type": "city", "city": "Dallas", "state_code": "TX"}})
+
+    assert resolver.resolve("dallas,  tx")["city"] == "Dallas"
+    assert resolver.resolve("85281") == {"area_type": "postal_code", "postal_code": "85281"}
+
+    results = scrape_property(location="Dallas, TX", listing_type="sold", limit=200, location_resolver=resolver)
+    assert results is not None and len(results) > 0
+
+
+def test_details_cache():
+    details_cache = DetailsCache()
+
+    sold = scrape_property(location="Surprise, AZ", listing_type="sold", limit=100, details_cache=details_cache)
+    sold_again = scrape_property(location="Surprise, AZ", listing_type="sold", limit=100, details_cache=details_cache)
+
+    assert details_cache.stats()["hits"] >= len(sold)
+    assert sold["tax"].notnull().sum() == sold_again["tax"].notnull().sum()
+
+
+def test_incremental_watermark(tmp_path):
+    watermark_store = WatermarkStore(str(tmp_path / "watermarks.sqlite"))
+
+    first_run = scrape_property(
+        location="Dallas, TX", listing_type="sold", past_days=30, watermark_store=watermark_store
+    )
+    second_run = scrape_property(
+        location="Dallas, TX", listing_type="sold", past_days=30, watermark_store=watermark_store
+    )
+
+    assert first_run is not None and len(first_run) > 0
+    assert len(second_run) < len(first_run)
+
+
+def test_auto_shard():
+    results = scrape_property(
+        location="Harris County, TX",
+        listing_type="sold",
+        past_days=365,
+        limit=12000,
+        auto_shard=True,
+        extra_property_data=False,
+    )
+
+    assert len(results) > 10000
+    assert results["property_id"].is_unique
+
+
+def test_rate_limiter():
+    rate_limiter = RateLimiter(rate=5)
+
+    results = scrape_property(location="Surprise, AZ", listing_type="sold", limit=400, rate_limiter=rate_limiter)
+    stats = rate_limiter.stats()
+
+    assert results is not None and len(results) > 0
+    assert stats["www.realtor.com"]["requests"] > 0
+    assert stats["www.realtor.com"]["in_flight"] == 0
+
+
+def test_scheduler():
+    scheduler = Scheduler(page_workers=2, detail_workers=4)
+
+    first = scrape_property(location="Surprise, AZ", listing_type="sold", limit=600, scheduler=scheduler)
+    second = scrape_property(location="Surprise, AZ", listing_type="for_sale", limit=600, scheduler=scheduler)
+    stats = scheduler.stats()
+
+    assert len(first) > 0 and len(second) > 0
+    assert stats["pages"]["threads"] == 2 and stats["details"]["threads"] == 4
+
+
+def test_record_replay_transport(tmp_path):
+    recording = str(tmp_path / "scrape.jsonl")
+
+    recorded = scrape_property(
+        location="Surprise, AZ", listing_type="sold", limit=300, transport=RecordingTransport(recording)
+    )
+    replayed = scrape_property(
+        location="Surprise, AZ", listing_type="sold", limit=300, transport=ReplayTransport(recording)
+    )
+
+    assert len(recorded) > 0
+    assert recorded["property_id"].tolist() == replayed["property_id"].tolist()
+
+
+def test_http2():
+    pytest.importorskip("h2")
+
+    results = scrape_property(location="Surprise, AZ", listing_type="sold", limit=200, http2=True)
+
+    assert results is not None and len(results) > 0
+    assert results["tax"].notnull().any()
+
+    #: the transport the search used for the GraphQL hosts
+    transport = HttpxTransport.shared(http2=True, pool_size=DEFAULT_SCHEDULER.workers)
+    response = transport.request("POST", RealtorScraper.SEARCH_GQL_URL, json={"query": "{ __typename }"})
+
+    assert response.http_version == "HTTP/2"
+
+
+class FakeProxyTransport:
+    """
+    Stands in for a proxy's transport, answering every request with the same status code (or connection error)
+    """
+
+    def __init__(self, status_code: int = 200, error: Exception | None = None):
+        self.status_code = status_code
+        self.error = error
+        self.requests = 0
+
+    def request(self, method: str, url: str, **kwargs):
+        self.requests += 1
+
+        if self.error is not None:
+            raise self.error
+
+        return TransportResponse(status_code=self.status_code, content=b"{}")
+
+
+def test_proxy_pool():
+    proxies = ["http://127.0.0.1:8001", "http://127.0.0.1:8002", "http://127.0.0.1:8003", "http://127.0.0.1:8004"]
+    proxy_pool = ProxyPool(proxies, ejection_time=60)
+    healthy, other_healthy, throttled, unreachable = [FakeProxyTransport() for _ in proxies]
+    throttled.status_code = 429
+    unreachable.error = requests.ConnectionError("Connection refused")
+
+    for proxy, transport in zip(proxy_pool.proxies, [healthy, other_healthy, throttled, unreachable]):
+        proxy.transport = transport
+
+    responses = [proxy_pool.request("POST", "https://www.realtor.com/api/v1/rdc_search_srp") for _ in range(30)]
+    stats = proxy_pool.stats()
+
+    assert throttled.requests == 1 and stats["127.0.0.1:8003"]["ejected"]
+    assert unreachable.requests == 1 and stats["127.0.0.1:8004"]["ejected"]
+    assert stats["127.0.0.1:8004"]["failures"] == 1
+
+    #: the unreachable proxy's request was sent again with another proxy, the others spread over the healthy proxies
+    assert sum(response.status_code == 200 for response in responses) == 29
+    assert healthy.requests + other_healthy.requests == 29
+    assert healthy.requests > 0 and other_healthy.requests > 0
+
+    for proxy in proxy_pool.proxies:
+        proxy.transport = FakeProxyTransport(error=requests.ConnectionError("Connection refused"))
+        proxy.ejected_until = 0
+
+    try:
+        proxy_pool.request("POST", "https://www.realtor.com/api/v1/rdc_search_srp")
+    except requests.ConnectionError:
+        pass
+    else:
+        assert False, "a request failing on every proxy should raise its error"
+
+    assert all(proxy.ejections >= 1 for proxy in proxy_pool.proxies)
+
+
+def legacy_process_result(result: Property) -> pd.DataFrame:
+    """
+    The row-by-row process_result PropertyFrameBuilder replaced: one single-row DataFrame per property
+    """
+    prop_data = {prop: None for prop in ordered_properties}
+    prop_data.update({field.name: getattr(result, field.name) for field in fields(result)})
+
+    if prop_data["address"]:
+        address_data = prop_data["address"]
+        prop_data["full_street_line"] = address_data.full_line
+        prop_data["street"] = address_data.street
+        prop_data["unit"] = address_data.unit
+        prop_data["city"] = address_data.city
+        prop_data["state"] = address_data.state
+        prop_data["zip_code"] = address_data.zip
+
+    if prop_data["advertisers"]:
+        advertiser_data = prop_data["advertisers"]
+        if advertiser_data.agent:
+            agent_data = advertiser_data.agent
+            prop_data["agent_id"] = agent_data.uuid
+            prop_data["agent_name"] = agent_data.name
+            prop_data["agent_email"] = agent_data.email
+            prop_data["agent_phones"] = agent_data.phones
+            prop_data["agent_mls_set"] = agent_data.mls_set
+            prop_data["agent_nrds_id"] = agent_data.nrds_id
+
+        if advertiser_data.office:
+            office_data = advertiser_data.office
+            prop_data["office_id"] = office_data.uuid
+            prop_data["office_name"] = office_data.name
+            prop_data["office_email"] = office_data.email
+            prop_data["office_phones"] = office_data.phones
+            prop_data["office_mls_set"] = office_data.mls_set
+
+    prop_data["price_per_sqft"] = prop_data["prc_sqft"]
+    prop_data["nearby_schools"] = filter(None, prop_data["nearby_schools"]) if prop_data["nearby_schools"] else None
+    prop_data["nearby_schools"] = ", ".join(set(prop_data["nearby_schools"])) if prop_data["nearby_schools"] else None
+
+    description = result.description
+    if description:
+        prop_data["primary_photo"] = description.primary_photo
+        prop_data["alt_photos"] = ", ".join(description.alt_photos) if description.alt_photos else None
+        prop_data["style"] = description.style.value if description.style else None
+        prop_data["beds"] = description.beds
+        prop_data["full_baths"] = description.baths_full
+        prop_data["half_baths"] = description.baths_half
+        prop_data["sqft"] = description.sqft
+        prop_data["lot_sqft"] = description.lot_sqft
+        prop_data["sold_price"] = description.sold_price
+        prop_data["year_built"] = description.year_built
+        prop_data["parking_garage"] = description.garage
+        prop_data["stories"] = description.stories
+        prop_data["text"] = description.text
+
+    return pd.DataFrame([prop_data]).reindex(columns=ordered_properties)
+
+
+def test_property_frame_builder():
+    properties = [
+        Property(
+            property_url=f"https://www.realtor.com/realestateandhomes-detail/{i}",
+            property_id=str(i),
+            mls="SDCA",
+            status="SOLD" if i % 2 else "FOR_SALE",
+            address=(
+                Address(full_line=f"{i} Main St", street=f"{i} Main St", city="San Diego", state="CA", zip="92101")
+                if i != 3
+                else None
+            ),
+            list_price=500_000 + i,
+            list_date="2024-05-01",
+            prc_sqft=350 + i,
+            new_construction=bool(i % 3),
+            hoa_fee=None if i % 2 else 100,
+            latitude=32.7,
+            longitude=-117.1,
+            nearby_schools=["San Diego Unified School District"] if i % 2 else None,
+            tax_history=[{"year": 2023, "tax": 5000}],
+            description=(
+                Description(
+                    primary_photo=f"https://ap.rdcpix.com/{i}.webp",
+                    alt_photos=[f"https://ap.rdcpix.com/{i}-1.webp", f"https://ap.rdcpix.com/{i}-2.webp"],
+                    style=PropertyType.SINGLE_FAMILY,
+                    beds=3,
+                    sqft=1000 + i,
+                    garage=2.0,
+                    text="",
+                )
+                if i != 4
+                else None
+            ),
+            advertisers=(
+                Advertisers(
+                    agent=Agent(name="Jane Doe", uuid=str(i), phones=[{"number": "5555555555", "type": "Mobile"}]),
+                    office=Office(name="Realty Co", uuid="42", email="None"),
+                )
+                if i != 5
+                else None
+            ),
+        )
+        for i in range(8)
+    ]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=FutureWarning)
+        legacy = pd.concat([legacy_process_result(result) for result in properties], ignore_index=True, axis=0)[
+            ordered_properties
+        ].replace({"None": pd.NA, None: pd.NA, "": pd.NA})
+
+    pd.testing.assert_frame_equal(process_results(properties), legacy)
+
+
+def test_return_stats():
+    results, metrics = scrape_property(location="Surprise, AZ", listing_type="sold", limit=250, return_stats=True)
+    snapshot = metrics.snapshot()
+
+    assert len(results) > 0
+    assert snapshot["requests"]["search:Home_search"]["requests"] >= 2
+    assert snapshot["requests"]["details:GetHomes"]["response_bytes"] > 0
+    assert "dataframe" in snapshot["stages"]
+    assert 'homeharvest_requests_total{endpoint="search",query="Home_search",status="200"}' in metrics.to_prometheus()
+
+    results, metrics = scrape_properties(["Surprise, AZ", "85374"], listing_type="sold", limit=250, return_stats=True)
+    snapshot = metrics.snapshot()
+
+    assert len(results) > 0
+    assert snapshot["requests"]["search:Home_search"]["requests"] >= 4
+    assert "enrich" in snapshot["stages"]
+
+    table, metrics = scrape_property_arrow(location="Surprise, AZ", listing_type="sold", limit=250, return_stats=True)
+
+    assert table.num_rows > 0
+    assert "arrow" in metrics.snapshot()["stages"]
+
+
+def test_tracer(tmp_path):
+    tracer = RecordingTracer()
+    profile_path = tmp_path / "scrape.prof"
+    results = scrape_property(
+        location="Surprise, AZ", listing_type="sold", limit=250, tracer=tracer, profile=str(profile_path)
+    )
+    summary = tracer.summary()
+
+    assert summary["scrape_property"]["count"] == 1
+    assert summary["general_search"]["count"] >= 2
+    assert summary["process_property"]["count"] >= len(results)
+    assert all(span.parent is not None for span in tracer.spans if span.name != "scrape_property")
+    assert profile_path.exists()
+
+    profile_path = tmp_path / "locations.prof"
+    scrape_properties(["Surprise, AZ", "85374"], listing_type="sold", limit=250, profile=str(profile_path))
+
+    assert profile_path.exists()
+
+
+def test_timeout():
+    started_at = time.monotonic()
+    results = scrape_property(location="Dallas, TX", listing_type="for_sale", timeout=3)
+
+    assert time.monotonic() - started_at < 10
+    assert results.attrs["partial"] and results.attrs["skipped_pages"] > 0
+
+    #: only the properties returned without their extra property data count as skipped details, not those of the
+    #: pages that were skipped
+    assert 0 < len(results) and results.attrs["skipped_details"] <= results["tax_history"].isna().sum()
+
+    token = CancellationToken()
+    token.cancel()
+    cancelled_results = scrape_property(location="Dallas, TX", listing_type="for_sale", cancellation_token=token)
+
+    assert cancelled_results.empty and cancelled_results.attrs["partial"]
+
+
+def test_checkpoint_resume(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "checkpoints.sqlite"))
+    token = CancellationToken()
+    pages = 0
+
+    for _ in scrape_property_stream(
+        location="Dallas, TX", listing_type="for_sale", checkpoint=checkpoint, cancellation_token=token
+    ):
+        pages += 1
+        if pages == 2:  #: the scrape dies halfway
+            token.cancel()
+
+    assert checkpoint.stats()["journaled_pages"] >= 2
+
+    resumed_checkpoint = Checkpoint(str(tmp_path / "checkpoints.sqlite"), resume=True)
+    results = scrape_property(location="Dallas, TX", listing_type="for_sale", checkpoint=resumed_checkpoint)
+
+    assert len(results) > 0
+    assert resumed_checkpoint.stats()["resumed_pages"] >= 2
+    assert resumed_checkpoint.stats()["journaled_pages"] == 0
+
+
+def test_range_filters():
+    results = scrape_property(
+        location="Dallas, TX",
+        listing_type="for_sale",
+        price_min=300000,
+        price_max=600000,
+        beds_min=3,
+        property_filter=lambda home: home.description.sqft is None or home.description.sqft > 1500,
+        extra_property_data=False,
+    )
+
+    assert len(results) > 0
+    assert results["list_price"].between(300000, 600000).all()
+    assert (results["beds"] >= 3).all()
+    assert (results["sqft"].dropna() > 1500).all()
+
+
+def test_columns():
+    columns = ["property_url", "list_price", "city", "status"]
+    results = scrape_property(location="Dallas, TX", listing_type="for_sale", columns=columns, limit=400)
+
+    assert list(results.columns) == columns
+    assert len(results) > 0
+    assert results["property_url"].notna().all()
+
+    results = scrape_property(location="Dallas, TX", listing_type="for_sale", columns=["property_id", "tax"], limit=50)
+
+    assert list(results.columns) == ["property_id", "tax"]
+    assert results["tax"].notna().any()
+
+    try:
+        scrape_property(location="Dallas, TX", columns=["not_a_column"])
+        assert False, "unknown columns should be rejected"
+    except ValueError:
+        pass
+
+
+def test_json_decoder():
+    orjson_results = scrape_property(location="Surprise, AZ", listing_type="for_sale", limit=200, json_decoder="orjson")
+    json_results = scrape_property(location="Surprise, AZ", listing_type="for_sale", limit=200, json_decoder="json")
+
+    assert len(orjson_results) > 0
+    assert set(orjson_results["property_id"]) == set(json_results["property_id"])
+
+
+def test_slotted_properties():
+    realty_property = next(iter_properties(location="Dallas, TX", listing_type="for_sale", limit=10))
+
+    assert not hasattr(realty_property, "__dict__")
+    assert not hasattr(realty_property.address, "__dict__")
+    assert realty_property.status is sys.intern(realty_property.status)
+
+
+def test_arrow(tmp_path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = scrape_property_arrow(location="Surprise, AZ", listing_type="sold", limit=200)
+
+    assert table.num_rows > 0
+    assert pa.types.is_int64(table.schema.field("list_price").type)
+    assert pa.types.is_int64(table.schema.field("parking_garage").type)
+    assert pa.types.is_float64(table.schema.field("price_per_sqft").type)
+    assert pa.types.is_float64(table.schema.field("hoa_fee").type)
+    assert pa.types.is_float64(table.schema.field("tax").type)
+    assert pa.types.is_float64(table.schema.field("assessed_value").type)
+    assert pa.types.is_float64(table.schema.field("tax_history").type.value_type.field("tax").type)
+    assert pa.types.is_list(table.schema.field("tax_history").type)
+    assert pa.types.is_list(table.schema.field("agent_phones").type)
+
+    with ParquetStreamWriter(str(tmp_path / "sold.parquet")) as writer:
+        for page in scrape_property_arrow_stream(location="Surprise, AZ", listing_type="sold", limit=400):
+            writer.write(page)
+
+    parquet_file = pq.ParquetFile(tmp_path / "sold.parquet")
+
+    assert parquet_file.metadata.num_row_groups == 2
+    assert parquet_file.metadata.num_rows == writer.rows
+
+
+def test_stream_writers(tmp_path):
+    from homeharvest.writers import CsvStreamWriter, JsonLinesStreamWriter, ExcelStreamWriter
+
+    paths = {
+        CsvStreamWriter: tmp_path / "sold.csv",
+        JsonLinesStreamWriter: tmp_path / "sold.jsonl",
+        ExcelStreamWriter: tmp_path / "sold.xlsx",
+    }
+    writers = [writer(str(path)) for writer, path in paths.items()]
+
+    for chunk in scrape_property_stream(location="Surprise, AZ", listing_type="sold", limit=400):
+        for writer in writers:
+            writer.write(chunk)
+
+    for writer in writers:
+        writer.close()
+
+    rows = writers[0].rows
+    assert rows > 0
+    assert len(pd.read_csv(paths[CsvStreamWriter])) == rows
+    assert len(pd.read_json(paths[JsonLinesStreamWriter], lines=True)) == rows
+    assert len(pd.read_excel(paths[ExcelStreamWriter])) == rows